@@ -0,0 +1,424 @@
+"""
+匯出效能基準測試。
+
+在暫存資料夾中產生合成專案（可設定深度、每層資料夾數、檔案大小分佈與二進位檔比例），
+分別量測各階段的耗時：
+
+    scan    以 scan_tree_worker 建立檔案索引（與圖形介面 _populate_tree 的背景掃描相同）
+    tree    generate_full_tree 產生目錄結構文字
+    select  select_files 收集要匯出的檔案
+    export  create_project_summary，依 --workers 逐一量測，並列出讀取、token 估算、寫入等細項
+
+每個階段另外執行兩次：第一次記錄系統呼叫次數與常駐記憶體，第二次以 tracemalloc 記錄 Python 物件的記憶體峰值。
+
+    open、scandir  sys.addaudithook 的稽核事件數（包含 os.open 與內建 open）
+    stat           os.stat、os.lstat、os.fstat 與 DirEntry.stat 的呼叫次數（量測期間以計數函式取代）；
+                   os.path.isdir 等透過 os.stat 實作的函式一併計入，DirEntry.is_dir 在檔案系統
+                   不提供類型時的隱含 stat 則無法計入
+    RSS Δ          階段中常駐記憶體峰值減去開始時的常駐記憶體，包含 mmap 與原生緩衝區；
+                   Linux 以 /proc/self/clear_refs 重設峰值（VmHWM），其他平台只能取得整個程序峰值的增加量
+    py heap        tracemalloc 的峰值，只包含 Python 配置的記憶體
+結果可用 --json 輸出為 JSON，並以 --compare 與先前版本的結果比較。
+可用 --root 將合成專案建立在網路磁碟等較慢的儲存裝置上，
+或以 --latency-ms 在每次開檔時加入延遲，模擬網路儲存的開檔成本。
+
+    python benchmark.py --files 40000 --workers 1 4 8 16 --latency-ms 1
+    python benchmark.py --files 20000 --depth 4 --binary-ratio 0.1 --json after.json --compare before.json
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import queue
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+import exporter
+import filetypes
+from exporter import (FileIndex, StageTimer, create_project_summary, generate_full_tree, scan_tree_worker,
+                      select_files)
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+RESULT_FORMAT_VERSION = 2
+
+# 稽核事件只在量測中的階段計數；sys.addaudithook 無法移除，因此只安裝一次
+_audit_counts = None
+_audit_installed = False
+
+
+def _audit_hook(event, args):
+    counts = _audit_counts
+    if counts is not None:
+        counts[event] = counts.get(event, 0) + 1
+
+
+def _install_audit_hook():
+    global _audit_installed
+    if not _audit_installed and hasattr(sys, "addaudithook"):
+        sys.addaudithook(_audit_hook)
+        _audit_installed = True
+
+
+class _CallCounter:
+    """量測期間的系統呼叫計數；匯出會在多個執行緒中呼叫，以鎖保護"""
+    def __init__(self):
+        self.counts = {}
+        self.lock = threading.Lock()
+
+    def add(self, name):
+        with self.lock:
+            self.counts[name] = self.counts.get(name, 0) + 1
+
+
+class _CountingDirEntry:
+    """轉送 DirEntry 的屬性；stat() 的結果由 DirEntry 快取，只計算每種模式的第一次呼叫"""
+    __slots__ = ("_entry", "_counter", "_stated")
+
+    def __init__(self, entry, counter):
+        self._entry = entry
+        self._counter = counter
+        self._stated = set()
+
+    def __getattr__(self, name):
+        return getattr(self._entry, name)
+
+    def __fspath__(self):
+        return self._entry.path
+
+    def stat(self, *, follow_symlinks=True):
+        if follow_symlinks not in self._stated:
+            self._stated.add(follow_symlinks)
+            self._counter.add("DirEntry.stat")
+        return self._entry.stat(follow_symlinks=follow_symlinks)
+
+
+class _CountingScandir:
+    def __init__(self, iterator, counter):
+        self._iterator = iterator
+        self._counter = counter
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return _CountingDirEntry(next(self._iterator), self._counter)
+
+    def close(self):
+        self._iterator.close()
+
+
+def _count_stat_calls(counter):
+    """以計數函式取代 os 模組的 stat 系列函式與 scandir，回傳還原用的原始函式"""
+    originals = {name: getattr(os, name) for name in ("stat", "lstat", "fstat", "scandir")}
+
+    def counting(name):
+        original = originals[name]
+
+        def wrapper(*args, **kwargs):
+            counter.add(f"os.{name}")
+            return original(*args, **kwargs)
+        return wrapper
+
+    for name in ("stat", "lstat", "fstat"):
+        setattr(os, name, counting(name))
+    os.scandir = lambda *args: _CountingScandir(originals["scandir"](*args), counter)
+    return originals
+
+
+def _proc_status_kb(field):
+    """讀取 /proc/self/status 中以 kB 為單位的欄位（僅 Linux），無法讀取時回傳 None"""
+    try:
+        with open("/proc/self/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def _reset_peak_rss():
+    """將 VmHWM 重設為目前的常駐記憶體（Linux 4.0 以上），成功時回傳 True"""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        return False
+    return _proc_status_kb("VmHWM") is not None
+
+
+def _synthetic_dir(i, depth, fanout):
+    """第 i 個檔案所在的相對資料夾：每個最底層資料夾 fanout 個檔案，最上層資料夾數不限"""
+    leaf = i // fanout
+    parts = []
+    for level in range(depth):
+        if level == depth - 1:
+            parts.append(f"pkg_{leaf}")
+        else:
+            parts.append(f"mod_{leaf % fanout}")
+            leaf //= fanout
+    parts.reverse()
+    return os.path.join(*parts) if parts else ""
+
+
+def _synthetic_size(rng, size_dist, min_size, max_size, median_size):
+    if size_dist == "uniform":
+        return rng.randint(min_size, max_size)
+    # 對數常態分佈：多數檔案接近中位數，少數檔案特別大，較接近真實專案
+    size = int(rng.lognormvariate(math.log(median_size), 1.0))
+    return min(max(size, min_size), max_size)
+
+
+def generate_synthetic_tree(root, files, depth=2, fanout=20, size_dist="lognormal", min_size=200,
+                            max_size=256 * 1024, median_size=4000, binary_ratio=0.0, seed=0):
+    """
+    產生含有 files 個檔案的合成專案，回傳 (文字檔路徑列表, 統計資料)。
+    二進位檔不加副檔名，掃描時需要讀取開頭位元組判斷類型。
+    """
+    rng = random.Random(seed)
+    paths = []
+    stats = {"files": files, "dirs": 0, "bytes": 0, "binary_files": 0}
+    created = set()
+    for i in range(files):
+        subdir = os.path.join(root, _synthetic_dir(i, depth, fanout))
+        if subdir not in created:
+            os.makedirs(subdir, exist_ok=True)
+            created.add(subdir)
+        size = _synthetic_size(rng, size_dist, min_size, max_size, median_size)
+        stats["bytes"] += size
+        if rng.random() < binary_ratio:
+            with open(os.path.join(subdir, f"blob_{i}"), 'wb') as f:
+                f.write(rng.getrandbits(size * 8).to_bytes(size, 'little'))
+            stats["binary_files"] += 1
+            continue
+        path = os.path.join(subdir, f"file_{i}.py")
+        line = f"value_{i} = {i}  # synthetic line\n"
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write((line * (size // len(line) + 1))[:size])
+        paths.append(path)
+    stats["dirs"] = len(created)
+    return paths, stats
+
+
+def simulate_open_latency(latency_ms):
+    """讓匯出模組中的每次開檔都延遲 latency_ms 毫秒（sleep 會釋放 GIL，與網路 I/O 相同）"""
+    def slow_open(*args, **kwargs):
+        time.sleep(latency_ms / 1000)
+        return open(*args, **kwargs)
+    exporter.open = slow_open
+
+
+def scan_project(root):
+    """與圖形介面相同，以背景執行緒掃描並從佇列收取結果，回傳 FileIndex"""
+    filetypes._verdicts.clear()
+    index = FileIndex(root)
+    out_queue = queue.Queue()
+    worker = threading.Thread(target=scan_tree_worker, args=(index, out_queue, threading.Event()))
+    worker.start()
+    while out_queue.get()[0] == "batch":
+        pass
+    worker.join()
+    return index
+
+
+def measure(fn, repeat):
+    """執行 repeat 次並回傳 (最佳秒數, 最後一次的回傳值)"""
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def instrument(fn):
+    """
+    再執行兩次：第一次記錄稽核事件數、stat 系列的呼叫次數與常駐記憶體峰值的增加量，
+    第二次記錄 tracemalloc 的峰值（tracemalloc 本身會佔用記憶體，因此不與常駐記憶體同時量測）。
+    """
+    global _audit_counts
+    counter = _CallCounter()
+    exact = _reset_peak_rss()
+    rss_before = _proc_status_kb("VmRSS") if exact else _max_rss_kb()
+    originals = _count_stat_calls(counter)
+    _audit_counts = {}
+    try:
+        fn()
+    finally:
+        audit_counts, _audit_counts = _audit_counts, None
+        for name, original in originals.items():
+            setattr(os, name, original)
+    rss_peak = _proc_status_kb("VmHWM") if exact else _max_rss_kb()
+    rss_delta = None
+    if rss_before is not None and rss_peak is not None:
+        rss_delta = max(rss_peak - rss_before, 0) * 1024
+
+    tracemalloc.start()
+    try:
+        fn()
+    finally:
+        heap_peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return {"py_heap_peak_bytes": heap_peak,
+            "rss_peak_delta_bytes": rss_delta,
+            "rss_peak_exact": exact,
+            "audit_events": dict(sorted(audit_counts.items())),
+            "stat_calls": dict(sorted(counter.counts.items()))}
+
+
+def run_benchmark(project, paths, output_file, workers_list, repeat):
+    """量測所有階段，回傳 {階段名稱: 結果}"""
+    stages = {}
+
+    seconds, index = measure(lambda: scan_project(project), repeat)
+    stages["scan"] = dict(seconds=seconds, **instrument(lambda: scan_project(project)))
+
+    seconds, _ = measure(lambda: generate_full_tree(project, index), repeat)
+    stages["tree"] = dict(seconds=seconds, **instrument(lambda: generate_full_tree(project, index)))
+
+    seconds, selected = measure(lambda: select_files(index), repeat)
+    stages["select"] = dict(seconds=seconds, **instrument(lambda: select_files(index)))
+
+    for workers in workers_list:
+        best = None
+        for _ in range(repeat):
+            timer = StageTimer()
+            start = time.perf_counter()
+            create_project_summary(project, output_file, selected, False, index=index,
+                                   read_workers=workers, timer=timer)
+            elapsed = time.perf_counter() - start
+            if best is None or elapsed < best[0]:
+                best = (elapsed, timer)
+        extra = instrument(lambda: create_project_summary(project, output_file, selected, False,
+                                                          index=index, read_workers=workers))
+        stages[f"export_w{workers}"] = dict(seconds=best[0], breakdown=best[1].as_dict(),
+                                            output_bytes=os.path.getsize(output_file), **extra)
+    return stages
+
+
+def _max_rss_kb():
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS 以位元組為單位，Linux 以 KB 為單位
+    return rss // 1024 if sys.platform == "darwin" else rss
+
+
+def print_report(result):
+    tree = result["tree"]
+    print(f"\n📊 {tree['files']:,} 個檔案（二進位 {tree['binary_files']:,}）、"
+          f"{tree['dirs']:,} 個資料夾、{tree['bytes'] / 1e6:.1f} MB")
+    print(f"{'stage':<12}{'seconds':>10}{'files/s':>12}{'MB/s':>8}{'RSS Δ MB':>10}{'py heap MB':>11}"
+          f"{'open':>8}{'scandir':>9}{'stat':>9}")
+    exact = True
+    for name, stage in result["stages"].items():
+        seconds = stage["seconds"]
+        events = stage["audit_events"]
+        rss = stage["rss_peak_delta_bytes"]
+        rss = f"{rss / 1e6:>10.1f}" if rss is not None else f"{'-':>10}"
+        exact = exact and stage["rss_peak_exact"]
+        print(f"{name:<12}{seconds:>10.3f}{tree['files'] / seconds:>12,.0f}{tree['bytes'] / seconds / 1e6:>8.1f}"
+              f"{rss}{stage['py_heap_peak_bytes'] / 1e6:>11.1f}"
+              f"{events.get('open', 0):>8,}{events.get('os.scandir', 0):>9,}{sum(stage['stat_calls'].values()):>9,}")
+        for part, value in stage.get("breakdown", {}).items():
+            print(f"  {part:<10}{value['seconds']:>10.3f}")
+    print("RSS Δ：階段中常駐記憶體峰值的增加量（含 mmap 與原生緩衝區）；py heap：tracemalloc 峰值；"
+          "stat：os.stat、os.lstat、os.fstat 與 DirEntry.stat 的呼叫次數")
+    if not exact:
+        print("⚠️ 此平台無法重設常駐記憶體峰值，RSS Δ 只是整個程序峰值的增加量，前面的階段較高時為 0")
+    if result["max_rss_kb"] is not None:
+        print(f"最大常駐記憶體: {result['max_rss_kb'] / 1024:.1f} MB")
+
+
+def print_comparison(old, new):
+    """比較兩次結果中相同階段的耗時"""
+    print(f"\n{'stage':<12}{'before':>10}{'after':>10}{'change':>9}")
+    for name, stage in new["stages"].items():
+        before = old.get("stages", {}).get(name)
+        if before is None:
+            continue
+        ratio = stage["seconds"] / before["seconds"] if before["seconds"] else float("inf")
+        print(f"{name:<12}{before['seconds']:>10.3f}{stage['seconds']:>10.3f}{ratio - 1:>+9.1%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="量測掃描、目錄結構、選取與匯出各階段的效能")
+    parser.add_argument("--files", type=int, default=5000, help="合成檔案數量")
+    parser.add_argument("--depth", type=int, default=2, help="資料夾層數")
+    parser.add_argument("--fanout", type=int, default=20, help="每個資料夾的子資料夾數與最底層的檔案數")
+    parser.add_argument("--size-dist", choices=("lognormal", "uniform"), default="lognormal",
+                        help="檔案大小分佈")
+    parser.add_argument("--min-size", type=int, default=200, help="最小檔案大小（位元組）")
+    parser.add_argument("--max-size", type=int, default=256 * 1024, help="最大檔案大小（位元組）")
+    parser.add_argument("--median-size", type=int, default=4000, help="對數常態分佈的中位數（位元組）")
+    parser.add_argument("--binary-ratio", type=float, default=0.0, help="二進位檔比例（0~1）")
+    parser.add_argument("--seed", type=int, default=0, help="亂數種子")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 8], help="要比較的執行緒數")
+    parser.add_argument("--repeat", type=int, default=3, help="每個設定重複次數（取最佳值）")
+    parser.add_argument("--root", default=None, help="建立合成專案的位置（預設為系統暫存資料夾）")
+    parser.add_argument("--latency-ms", type=float, default=0, help="模擬每次開檔的延遲（毫秒）")
+    parser.add_argument("--json", metavar="PATH", default=None, help="將結果輸出為 JSON（- 表示標準輸出）")
+    parser.add_argument("--compare", metavar="PATH", default=None, help="與先前輸出的 JSON 結果比較")
+    args = parser.parse_args()
+
+    params = {name: getattr(args, name) for name in
+              ("files", "depth", "fanout", "size_dist", "min_size", "max_size", "median_size",
+               "binary_ratio", "seed", "workers", "repeat", "latency_ms")}
+    _install_audit_hook()
+
+    workdir = tempfile.mkdtemp(prefix="export_bench_", dir=args.root)
+    try:
+        project = os.path.join(workdir, "project")
+        print(f"📂 產生 {args.files:,} 個合成檔案於 {project} ...", file=sys.stderr)
+        paths, tree_stats = generate_synthetic_tree(
+            project, args.files, args.depth, args.fanout, args.size_dist,
+            args.min_size, args.max_size, args.median_size, args.binary_ratio, args.seed)
+        if args.latency_ms:
+            simulate_open_latency(args.latency_ms)
+
+        stages = run_benchmark(project, paths, os.path.join(workdir, "summary.txt"), args.workers, args.repeat)
+        result = {
+            "format": RESULT_FORMAT_VERSION,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "params": params,
+            "tree": tree_stats,
+            "stages": stages,
+            "max_rss_kb": _max_rss_kb(),
+        }
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.json == "-":
+        json.dump(result, sys.stdout, indent=2, sort_keys=True)
+        print()
+    else:
+        print_report(result)
+        if args.json:
+            with open(args.json, 'w', encoding='utf-8') as f:
+                json.dump(result, f, indent=2, sort_keys=True)
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            print_comparison(json.load(f), result)
+
+
+if __name__ == "__main__":
+    main()
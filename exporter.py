@@ -0,0 +1,1290 @@
+"""
+專案內容匯出核心：檔案索引、勾選規則、目錄樹與匯出寫入。
+
+本模組不依賴 tkinter，可由 GUI、命令列或其他程式直接呼叫。
+"""
+import bisect
+import fnmatch
+import hashlib
+import io
+import mmap
+import os
+import tempfile
+import time
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from filetypes import AUTO_EXCLUDED_KINDS, classify_file
+from ignore_rules import IGNORE_FILES, IgnoreMatcher, load_ignore_file
+from output_formats import JsonlWriter, check_output, open_output_files, output_format, part_path
+from text_encoding import align_end, align_start, copy_as_utf8, detect_encoding
+from tokens import TokenCounter, estimate_tokens
+
+# 匯出：讀取區塊大小與輸出緩衝區大小
+EXPORT_CHUNK_SIZE = 64 * 1024
+OUTPUT_BUFFER_SIZE = 1024 * 1024
+
+# 不小於此大小的檔案以 mmap 讀取（無法使用 mmap 時改以區塊讀取），其餘一次讀入。
+# mmap 期間檔案被其他程式截短時，存取超出新結尾的頁面會使程序收到 SIGBUS，
+# 因此只用於較少被編輯器直接改寫的大型檔案，監看模式的重新匯出也不使用
+MMAP_MIN_BYTES = 1024 * 1024
+
+# 平行讀取：預設執行緒數、每批最多的檔案數與位元組數、同時預讀中的位元組上限，
+# 以及可整檔預讀的大小上限（較大的檔案仍由寫入端串流處理）。
+# 預讀的區段在寫入前都留在記憶體中，因此以位元組而非檔案數限制預讀範圍
+DEFAULT_READ_WORKERS = 8
+PREFETCH_BATCH_FILES = 32
+PREFETCH_BATCH_BYTES = 1024 * 1024
+PREFETCH_WINDOW_BYTES = 16 * 1024 * 1024
+PREFETCH_MAX_BYTES = 256 * 1024
+
+# 區段格式版本；改變區段內容的寫法時遞增，使舊的快取失效
+SECTION_FORMAT_VERSION = 2
+SECTION_FOOTER = b"\n```\n\n"
+
+# token 預算：超出預算時的處理方式，以及截斷/分段時預留給標題與標記的 token 數
+BUDGET_MODES = ("drop", "truncate", "split")
+BUDGET_OVERHEAD_TOKENS = 32
+# 預算過小時每個分段幾乎只剩標題與標記，split 模式會產生大量極小的檔案
+MIN_TOKEN_BUDGET = 2 * BUDGET_OVERHEAD_TOKENS
+
+# 重複內容偵測：小於此大小的檔案不值得以參照取代；大小相同的檔案先比對開頭區塊的雜湊
+DEDUPE_MIN_BYTES = 64
+DEDUPE_HEAD_BYTES = 4096
+
+# 目錄結構中每個資料夾預設最多列出的項目數，超過的部分合併為一行
+DEFAULT_TREE_MAX_ENTRIES = 500
+
+def _collapsed_label(hidden_dirs, hidden_files):
+    parts = []
+    if hidden_dirs:
+        parts.append(f"{hidden_dirs:,} 個資料夾")
+    if hidden_files:
+        parts.append(f"{hidden_files:,} 個檔案")
+    return "… 還有 " + "、".join(parts)
+
+
+def iter_tree_lines(start_path, index=None, max_depth=None, max_entries=None, exclude=()):
+    """
+    以迭代方式逐行產生排除隱藏文件和文件夾的目錄結構樹（不含換行字元），
+    不論資料夾多深都不會遞歸，也不需要先組出完整的字串。
+    max_depth 限制展開的層數（根目錄的直接子項目為第 1 層），更深的資料夾只列出名稱；
+    max_entries 限制每個資料夾列出的項目數（資料夾優先），其餘以「… 還有 N 個檔案」一行表示。
+    None 或 0 表示不限制。若提供 FileIndex 則直接使用其掃描結果，不再重新讀取磁碟。
+    exclude 為不列出的檔案相對路徑集合（例如位於專案內的輸出檔案）。
+    """
+    if index is None:
+        index = FileIndex(start_path)
+
+    def open_dir(rel_path, prefix, depth):
+        # 索引中已排除隱藏項目並分離資料夾與檔案；先列資料夾再列檔案
+        dirs, files = index.children(rel_path)
+        child_prefix = rel_path + '/' if rel_path else ''
+        if exclude:
+            files = [entry for entry in files if child_prefix + entry.name not in exclude]
+        if max_entries and len(dirs) + len(files) > max_entries:
+            shown = dirs[:max_entries]
+            shown += files[:max_entries - len(shown)]
+            hidden_dirs = len(dirs) - min(len(dirs), max_entries)
+            hidden_files = len(files) - (len(shown) - (len(dirs) - hidden_dirs))
+        else:
+            shown = dirs + files
+            hidden_dirs = hidden_files = 0
+        return [child_prefix, prefix, depth, shown, 0, hidden_dirs, hidden_files]
+
+    yield f"{os.path.basename(os.path.abspath(start_path))}/"
+
+    # 每個堆疊項目為一個正在列出的資料夾：[子項目路徑前綴, 行首前綴, 層數, 項目, 下一個位置, 隱藏的資料夾數, 隱藏的檔案數]
+    stack = [open_dir("", "", 1)]
+    while stack:
+        frame = stack[-1]
+        child_prefix, prefix, depth, shown, position, hidden_dirs, hidden_files = frame
+        if position == len(shown):
+            stack.pop()
+            if hidden_dirs or hidden_files:
+                yield f"{prefix}└── {_collapsed_label(hidden_dirs, hidden_files)}"
+            continue
+        frame[4] = position + 1
+
+        entry = shown[position]
+        is_last = position == len(shown) - 1 and not (hidden_dirs or hidden_files)
+        connector = "└── " if is_last else "├── "
+        if not entry.is_dir:
+            yield f"{prefix}{connector}{entry.name}"
+        elif max_depth and depth >= max_depth:
+            yield f"{prefix}{connector}{entry.name}/ …"
+        else:
+            yield f"{prefix}{connector}{entry.name}/"
+            extension = "    " if is_last else "│   "
+            stack.append(open_dir(child_prefix + entry.name, prefix + extension, depth + 1))
+
+
+def write_tree(output, start_path, index=None, max_depth=None, max_entries=None, exclude=()):
+    """將目錄結構區塊逐行寫入 ExportOutput，每累積約 EXPORT_CHUNK_SIZE 個字元寫入一次，回傳 token 數"""
+    tokens = output.write_block("專案完整目錄結構 (已排除隱藏檔案):\n```\n".encode('utf-8'))
+    pending = []
+    pending_size = 0
+    for line in iter_tree_lines(start_path, index, max_depth, max_entries, exclude):
+        pending.append(line)
+        pending_size += len(line) + 1
+        if pending_size >= EXPORT_CHUNK_SIZE:
+            pending.append("")
+            tokens += output.write_block("\n".join(pending).encode('utf-8'))
+            pending = []
+            pending_size = 0
+    pending.append("```\n\n")
+    tokens += output.write_block("\n".join(pending).encode('utf-8'))
+    return tokens
+
+
+def generate_full_tree(start_path, index=None, max_depth=None, max_entries=None):
+    """
+    生成排除隱藏文件和文件夾的完整目錄結構樹字串（行之間以換行分隔）。
+    匯出時改用 iter_tree_lines 直接逐行寫入，不需要保存整個字串。
+    """
+    return "\n".join(iter_tree_lines(start_path, index, max_depth, max_entries))
+
+
+class _FileView:
+    """
+    以 seek/read 提供與 bytes 相同的唯讀介面（len、索引、切片、find、rfind），
+    供無法或不應使用 mmap 的大型檔案使用。只保留最近讀取的一個區塊，
+    寫入端依區塊處理，因此記憶體用量與檔案大小無關。
+    """
+    def __init__(self, infile, size):
+        self.infile = infile
+        self.size = size
+        self.block_start = 0
+        self.block = b""
+
+    def __len__(self):
+        return self.size
+
+    def _read(self, start, end):
+        start = max(0, start)
+        end = self.size if end is None else min(self.size, end)
+        if start >= end:
+            return b""
+        offset = start - self.block_start
+        if offset >= 0 and end - self.block_start <= len(self.block):
+            return self.block[offset:end - self.block_start]
+        self.infile.seek(start)
+        self.block_start = start
+        self.block = self.infile.read(end - start)
+        return self.block
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            start, stop, _ = key.indices(self.size)
+            return self._read(start, stop)
+        if key < 0:
+            key += self.size
+        data = self._read(key, key + 1)
+        if not data:
+            raise IndexError("index out of range")
+        return data[0]
+
+    def find(self, sub, start=0, end=None):
+        index = self._read(start, end).find(sub)
+        return index if index < 0 else max(0, start) + index
+
+    def rfind(self, sub, start=0, end=None):
+        index = self._read(start, end).rfind(sub)
+        return index if index < 0 else max(0, start) + index
+
+
+@contextmanager
+def _file_content(infile, size, use_mmap=True):
+    """
+    取得已開啟檔案的內容：小檔案一次讀入；大型檔案以 mmap 對應（只讀取實際用到的頁面，
+    截斷時不必讀取中段），use_mmap 為 False 或無法使用 mmap（部分網路或 FUSE 磁碟）時
+    改用 _FileView 依區塊讀取。三者都支援切片與 find，寫入端不需區分。
+    """
+    if size < MMAP_MIN_BYTES:
+        yield infile.read()
+        return
+    data = None
+    if use_mmap:
+        try:
+            data = mmap.mmap(infile.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            data = None
+    if data is None:
+        yield _FileView(infile, size)
+        return
+    try:
+        yield data
+    finally:
+        data.close()
+
+
+def section_header(relative_path):
+    return f"({relative_path}的內容)\n```\n".encode('utf-8')
+
+
+def _write_section(data, outfile, relative_path, max_file_bytes=None):
+    """
+    將檔案內容（bytes、mmap 或 _FileView）寫成 (路徑的內容) 區段，回傳是否發生截斷。
+    編碼由 BOM 與取樣判斷，UTF-8 直接寫入，Big5、GBK 等轉為 UTF-8（見 text_encoding）。
+    """
+    size = len(data)
+    truncated = bool(max_file_bytes) and size > max_file_bytes
+
+    outfile.write(section_header(relative_path))
+    try:
+        encoding, bom = detect_encoding(data)
+        if not truncated:
+            copy_as_utf8(data, outfile, encoding, bom, size)
+        else:
+            head = align_end(data, max(bom, max_file_bytes // 2), encoding, bom)
+            tail = align_start(data, size - (max_file_bytes - max_file_bytes // 2), encoding, bom)
+            copy_as_utf8(data, outfile, encoding, bom, head, final=False)
+            outfile.write(f"\n... (已截斷 {tail - head:,} 位元組) ...\n".encode('utf-8'))
+            copy_as_utf8(data, outfile, encoding, tail, size)
+    finally:
+        outfile.write(SECTION_FOOTER)
+    return truncated
+
+
+def write_file_section(outfile, file_path, relative_path, max_file_bytes=None, use_mmap=True):
+    """
+    將單一檔案寫成 (路徑的內容) 區段；大型檔案以 mmap 或依區塊讀取，記憶體用量與檔案大小無關。
+    超過 max_file_bytes 的檔案只保留開頭與結尾各一半，中間以截斷標記取代。
+    檔案可能在讀取期間被改寫時（監看模式）應傳入 use_mmap=False。回傳是否發生截斷。
+    """
+    with open(file_path, 'rb') as infile:
+        with _file_content(infile, os.fstat(infile.fileno()).st_size, use_mmap) as data:
+            return _write_section(data, outfile, relative_path, max_file_bytes)
+
+
+def _prefetch_section(file_path, relative_path, max_file_bytes=None, use_mmap=True):
+    """
+    在工作執行緒中讀取並轉換小檔案，回傳 (區段位元組, 是否截斷)。
+    需要讀取的內容超過 PREFETCH_MAX_BYTES 時回傳 None，交由寫入端串流處理。
+    """
+    with open(file_path, 'rb') as infile:
+        size = os.fstat(infile.fileno()).st_size
+        needed = min(size, max_file_bytes) if max_file_bytes else size
+        if needed > PREFETCH_MAX_BYTES:
+            return None
+        with _file_content(infile, size, use_mmap) as data:
+            buffer = io.BytesIO()
+            truncated = _write_section(data, buffer, relative_path, max_file_bytes)
+            return buffer.getvalue(), truncated
+
+
+def _prefetch_batch(batch, max_file_bytes=None, use_mmap=True):
+    """預先讀取一批檔案；個別檔案的錯誤以例外物件回傳，不影響同批其他檔案"""
+    results = []
+    for file_path, relative_path in batch:
+        try:
+            results.append(_prefetch_section(file_path, relative_path, max_file_bytes, use_mmap))
+        except Exception as e:
+            results.append(e)
+    return results
+
+
+def _prefetch_cost(size, max_file_bytes=None):
+    """預讀一個檔案最多佔用的位元組數；大小未知時以上限計算，由寫入端串流的大檔案不佔用"""
+    if size is None:
+        return PREFETCH_MAX_BYTES
+    needed = min(size, max_file_bytes) if max_file_bytes else size
+    return needed if needed <= PREFETCH_MAX_BYTES else 0
+
+
+def _prefetch_batches(jobs, max_file_bytes=None, sizes=None):
+    """將 jobs 依檔案數與位元組數分批，產生 (批次, 估算位元組數)"""
+    batch, batch_bytes = [], 0
+    for job in jobs:
+        cost = _prefetch_cost(sizes.get(job[0]) if sizes is not None else None, max_file_bytes)
+        if batch and (len(batch) >= PREFETCH_BATCH_FILES or batch_bytes + cost > PREFETCH_BATCH_BYTES):
+            yield batch, batch_bytes
+            batch, batch_bytes = [], 0
+        batch.append(job)
+        batch_bytes += cost
+    if batch:
+        yield batch, batch_bytes
+
+
+def iter_file_sections(jobs, max_file_bytes=None, workers=DEFAULT_READ_WORKERS, use_mmap=True, sizes=None):
+    """
+    依照 jobs 的順序產生 (檔案路徑, 相對路徑, 預讀結果)。
+
+    workers 大於 1 時以執行緒池分批預先讀取後續檔案。sizes 為 {檔案路徑: 大小}（通常來自索引），
+    用來估算每批的大小，同時預讀中的位元組數不超過 PREFETCH_WINDOW_BYTES（不在 sizes 中的
+    檔案以 PREFETCH_MAX_BYTES 計算），因此記憶體用量與檔案數無關；輸出順序永遠與 jobs 相同。
+    預讀結果為 (區段位元組, 是否截斷)、讀取時發生的例外，或 None（表示由呼叫端串流讀取，
+    workers 小於等於 1 時皆為 None）。use_mmap 見 write_file_section。
+    """
+    if workers <= 1:
+        for file_path, relative_path in jobs:
+            yield file_path, relative_path, None
+        return
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        pending_bytes = 0
+        for batch, batch_bytes in _prefetch_batches(jobs, max_file_bytes, sizes):
+            while pending and (pending_bytes + batch_bytes > PREFETCH_WINDOW_BYTES or len(pending) >= workers * 2):
+                pending_bytes -= pending[0][2]
+                yield from _drain_prefetched(pending.popleft())
+            pending.append((batch, executor.submit(_prefetch_batch, batch, max_file_bytes, use_mmap), batch_bytes))
+            pending_bytes += batch_bytes
+        while pending:
+            yield from _drain_prefetched(pending.popleft())
+
+
+def _drain_prefetched(item):
+    """展開一個已送出的批次，依原順序產生 (檔案路徑, 相對路徑, 預讀結果)"""
+    batch, future, _ = item
+    for (file_path, relative_path), result in zip(batch, future.result()):
+        yield file_path, relative_path, result
+
+
+class _CountingWriter:
+    """轉送寫入的位元組並累計 token 估算值"""
+    def __init__(self, target):
+        self.target = target
+        self.counter = TokenCounter()
+
+    def write(self, data):
+        self.counter.update(data)
+        self.target.write(data)
+
+
+def _source_read(source, start, end):
+    """從位元組或可 seek 的檔案物件讀取 [start, end) 範圍"""
+    if isinstance(source, bytes):
+        return source[start:end]
+    source.seek(start)
+    return source.read(end - start)
+
+
+def _source_length(source):
+    if isinstance(source, bytes):
+        return len(source)
+    source.seek(0, io.SEEK_END)
+    return source.tell()
+
+
+def _section_content(source, relative_path):
+    """依區塊產生區段中程式碼框內的內容（不含標題與結尾），供 JSONL 等其他格式使用"""
+    start = len(section_header(relative_path))
+    end = _source_length(source) - len(SECTION_FOOTER)
+    while start < end:
+        stop = min(end, start + EXPORT_CHUNK_SIZE)
+        yield _source_read(source, start, stop)
+        start = stop
+
+
+def _cut_point(data):
+    """回傳 data 中適合截斷的長度：優先在最後一個換行之後，否則避開不完整的 UTF-8 字元"""
+    newline = data.rfind(b"\n")
+    if newline >= 0:
+        return newline + 1
+    i = len(data) - 1
+    while i >= 0 and len(data) - i <= 3 and (data[i] & 0xC0) == 0x80:
+        i -= 1
+    if i >= 0 and data[i] >= 0xC0:
+        needed = 2 if data[i] < 0xE0 else 3 if data[i] < 0xF0 else 4
+        if len(data) - i < needed:
+            return i
+    return len(data)
+
+
+class ExportOutput:
+    """
+    文字格式的匯出輸出，負責計算 token 並套用 token 預算。
+
+    output_files 為一個或多個文字格式的輸出路徑（可為 .gz、.zst 壓縮，見 output_formats），
+    所有路徑寫入相同的內容；沒有任何路徑時只計算 token。
+    token_budget 為 None 時所有區段照常寫入；否則依 budget_mode 處理超出預算的區段：
+    drop 略過放不下的檔案（後續較小的檔案仍可寫入）、truncate 截斷第一個放不下的
+    檔案後停止寫入、split 寫成多個編號的輸出檔案（name.part1.txt ...），每個檔案都在
+    預算內，單一檔案超過預算時再切成多段。
+    """
+    def __init__(self, output_files, token_budget=None, budget_mode="drop"):
+        if budget_mode not in BUDGET_MODES:
+            raise ValueError(f"未知的預算模式: {budget_mode}")
+        if token_budget and token_budget < MIN_TOKEN_BUDGET:
+            raise ValueError(f"Token 預算不可小於 {MIN_TOKEN_BUDGET}")
+        if isinstance(output_files, str):
+            output_files = [output_files]
+        self.output_files = list(output_files)
+        self.budget = token_budget or None
+        self.mode = budget_mode
+        self.paths = []
+        self.parts = 0
+        self.part_tokens = 0
+        self.total_tokens = 0
+        self.exhausted = False
+        self.outfile = None
+        self._open_part()
+
+    @property
+    def splitting(self):
+        return self.budget is not None and self.mode == "split"
+
+    def _open_part(self):
+        if self.outfile is not None:
+            self.outfile.close()
+        self.parts += 1
+        paths = self.output_files
+        if self.splitting:
+            paths = [part_path(path, self.parts) for path in paths]
+        self.outfile = open_output_files(paths, OUTPUT_BUFFER_SIZE)
+        self.paths.extend(paths)
+        self.part_tokens = 0
+
+    def _account(self, tokens):
+        self.part_tokens += tokens
+        self.total_tokens += tokens
+
+    def remaining(self):
+        return None if self.budget is None else self.budget - self.part_tokens
+
+    def write_block(self, data):
+        """寫入非檔案區段（例如目錄結構），不受預算限制"""
+        self.outfile.write(data)
+        tokens = estimate_tokens(data)
+        self._account(tokens)
+        return tokens
+
+    def stream_section(self, file_path, relative_path, max_file_bytes=None):
+        """不設預算時直接串流寫入大型檔案並計算 token，回傳 (是否截斷, token 數)"""
+        writer = _CountingWriter(self.outfile)
+        truncated = write_file_section(writer, file_path, relative_path, max_file_bytes)
+        tokens = writer.counter.tokens
+        self._account(tokens)
+        return truncated, tokens
+
+    def add_section(self, source, tokens, relative_path):
+        """
+        寫入一個完整區段（位元組或可 seek 的檔案物件），回傳 (狀態, 寫入的 token 數)。
+        狀態為 written、dropped、truncated 或 split。
+        """
+        if self.budget is None or (tokens <= self.remaining() and not self.exhausted):
+            self._copy(source)
+            self._account(tokens)
+            return "written", tokens
+
+        if self.mode == "drop" or self.exhausted:
+            return "dropped", 0
+
+        header = section_header(relative_path)
+        footer = SECTION_FOOTER
+        length = _source_length(source)
+        content_start, content_end = len(header), length - len(footer)
+        bytes_per_token = max(length, 1) / max(tokens, 1)
+
+        if self.mode == "truncate":
+            self.exhausted = True
+            available = self.remaining() - BUDGET_OVERHEAD_TOKENS
+            if available <= 0:
+                return "dropped", 0
+            piece = self._take(source, content_start, content_end, available, bytes_per_token)
+            section = header + piece + "\n... (已依 token 預算截斷) ...".encode('utf-8') + footer
+            written = self.write_block(section)
+            return "truncated", written
+
+        # split：放得下整個區段就換到新檔案，否則切成多段
+        if tokens <= self.budget:
+            self._open_part()
+            self._copy(source)
+            self._account(tokens)
+            return "written", tokens
+
+        written = 0
+        position = content_start
+        number = 1
+        while position < content_end:
+            available = self.remaining() - BUDGET_OVERHEAD_TOKENS
+            if available < self.budget // 4 and self.part_tokens:
+                self._open_part()
+                available = self.remaining() - BUDGET_OVERHEAD_TOKENS
+            data = self._take(source, position, content_end, available, bytes_per_token)
+            piece_header = f"({relative_path}的內容，第 {number} 段)\n```\n".encode('utf-8')
+            written += self.write_block(piece_header + data + footer)
+            position += len(data)
+            number += 1
+        return "split", written
+
+    def _take(self, source, start, content_end, available, bytes_per_token):
+        """讀取從 start 開始、估算 token 數不超過 available 的內容片段"""
+        take = max(int(available * bytes_per_token), 1)
+        for _ in range(3):
+            end = min(content_end, start + take)
+            data = _source_read(source, start, end)
+            if end < content_end:
+                data = data[:_cut_point(data)]
+            tokens = estimate_tokens(data)
+            if tokens <= available or len(data) <= 1:
+                break
+            # 估算的位元組/token 比例偏低時按比例縮小後重試
+            take = max(int(len(data) * available / tokens * 0.95), 1)
+        return data
+
+    def _copy(self, source):
+        if isinstance(source, bytes):
+            self.outfile.write(source)
+            return
+        source.seek(0)
+        while True:
+            chunk = source.read(EXPORT_CHUNK_SIZE)
+            if not chunk:
+                break
+            self.outfile.write(chunk)
+
+    def close(self):
+        if self.outfile is not None:
+            self.outfile.close()
+            self.outfile = None
+            if self.splitting:
+                self._remove_stale_parts()
+
+    def _remove_stale_parts(self):
+        """刪除先前分成更多段的匯出留下、這次沒有寫到的編號檔案"""
+        for path in self.output_files:
+            number = self.parts + 1
+            while os.path.isfile(part_path(path, number)):
+                os.remove(part_path(path, number))
+                number += 1
+
+
+class ExportProgress:
+    """
+    匯出進度回報介面。create_project_summary 只透過此介面輸出訊息，
+    GUI 與命令列各自繼承並實作；預設實作不做任何事。
+    tag 為訊息類型：info、info_header、success、processed、error。
+    所有方法都在匯出執行緒中呼叫。
+    """
+    def log(self, message, tag="info"):
+        pass
+
+    def begin(self, total_files, total_bytes):
+        """開始處理檔案前呼叫一次，提供檔案總數與總位元組數"""
+        pass
+
+    def file_done(self, file_path, nbytes):
+        """每個檔案處理完成（包含失敗或略過）時呼叫，nbytes 為原始檔案大小"""
+        pass
+
+
+def _format_duration(seconds):
+    """將秒數格式化為 m:ss 或 h:mm:ss"""
+    seconds = int(seconds + 0.5)
+    hours, rest = divmod(seconds, 3600)
+    minutes, seconds = divmod(rest, 60)
+    if hours:
+        return f"{hours}:{minutes:02d}:{seconds:02d}"
+    return f"{minutes}:{seconds:02d}"
+
+
+class ThroughputMeter:
+    """累計已處理的檔案數與位元組數，計算處理速度與預估剩餘時間"""
+    def __init__(self, total_files=0, total_bytes=0, clock=time.monotonic):
+        self.total_files = total_files
+        self.total_bytes = total_bytes
+        self.files = 0
+        self.bytes = 0
+        self.clock = clock
+        self.started = clock()
+
+    def add(self, files, nbytes):
+        self.files += files
+        self.bytes += nbytes
+
+    @property
+    def elapsed(self):
+        return self.clock() - self.started
+
+    def rates(self):
+        """回傳 (每秒檔案數, 每秒位元組數)"""
+        elapsed = self.elapsed
+        if elapsed <= 0:
+            return 0.0, 0.0
+        return self.files / elapsed, self.bytes / elapsed
+
+    def eta(self):
+        """預估剩餘秒數；有總位元組數時依位元組速度估算，尚無資料時回傳 None"""
+        files_rate, bytes_rate = self.rates()
+        if self.total_bytes and bytes_rate > 0:
+            return max(self.total_bytes - self.bytes, 0) / bytes_rate
+        if self.total_files and files_rate > 0:
+            return max(self.total_files - self.files, 0) / files_rate
+        return None
+
+    def describe(self):
+        """以一行文字描述目前進度與速度"""
+        files_rate, bytes_rate = self.rates()
+        text = f"{self.files:,} / {self.total_files:,} 個檔案 · {files_rate:,.0f} 檔/秒 · {bytes_rate / 1e6:.1f} MB/秒"
+        eta = self.eta()
+        if eta is not None and self.files < self.total_files:
+            text += f" · 剩餘約 {_format_duration(eta)}"
+        return text
+
+    def summary(self):
+        """匯出結束時的統計"""
+        files_rate, bytes_rate = self.rates()
+        return (f"⏱️ 共 {self.files:,} 個檔案、{self.bytes / 1e6:.1f} MB，耗時 {_format_duration(self.elapsed)}"
+                f"（{files_rate:,.0f} 檔/秒，{bytes_rate / 1e6:.1f} MB/秒）")
+
+
+class StageTimer:
+    """累計各階段的耗時與次數，用於效能分析（見 main.py export --profile 與 benchmark.py）"""
+    def __init__(self):
+        self.seconds = {}
+        self.calls = {}
+
+    def add(self, name, seconds):
+        self.seconds[name] = self.seconds.get(name, 0.0) + seconds
+        self.calls[name] = self.calls.get(name, 0) + 1
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def as_dict(self):
+        return {name: {"seconds": seconds, "calls": self.calls[name]} for name, seconds in self.seconds.items()}
+
+    def report(self):
+        """以多行文字列出各階段耗時"""
+        total = sum(self.seconds.values()) or 1.0
+        # 中文標題每字佔兩格寬度，填充量因此較少
+        lines = [f"{'階段':<10}{'秒數':>8}{'比例':>7}{'次數':>8}"]
+        for name, seconds in self.seconds.items():
+            lines.append(f"{name:<12}{seconds:>10.3f}{seconds / total:>9.1%}{self.calls[name]:>10,}")
+        return "\n".join(lines)
+
+
+def _file_size(index, file_path, relative_path):
+    """優先從索引取得檔案大小，避免再次 stat"""
+    if index is not None:
+        size = index.file_size(relative_path)
+        if size is not None:
+            return size
+    try:
+        return os.path.getsize(file_path)
+    except OSError:
+        return 0
+
+
+def _content_hash(file_path, limit=None):
+    """計算檔案內容（或開頭 limit 個位元組）的 BLAKE2b 雜湊；無法讀取時回傳 None"""
+    digest = hashlib.blake2b(digest_size=20)
+    try:
+        with open(file_path, 'rb') as f:
+            remaining = limit
+            while remaining is None or remaining > 0:
+                chunk = f.read(EXPORT_CHUNK_SIZE if remaining is None else min(EXPORT_CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                if remaining is not None:
+                    remaining -= len(chunk)
+                digest.update(chunk)
+    except OSError:
+        return None
+    return digest.digest()
+
+
+def _split_by_hash(groups, limit, workers):
+    """以雜湊將每組檔案再細分，只保留仍有兩個以上檔案的組"""
+    paths = [file_path for group in groups for file_path, _ in group]
+    if not paths:
+        return []
+    with ThreadPoolExecutor(max_workers=max(workers, 1)) as executor:
+        digests = dict(zip(paths, executor.map(lambda path: _content_hash(path, limit), paths)))
+    result = []
+    for group in groups:
+        by_digest = {}
+        for job in group:
+            digest = digests[job[0]]
+            if digest is not None:
+                by_digest.setdefault(digest, []).append(job)
+        result.extend(same for same in by_digest.values() if len(same) > 1)
+    return result
+
+
+def find_duplicates(jobs, sizes, workers=DEFAULT_READ_WORKERS):
+    """
+    找出內容完全相同的檔案，回傳 {重複檔案的完整路徑: 同組第一個檔案的相對路徑}，
+    第一個檔案本身不在結果中。jobs 為 (完整路徑, 相對路徑) 列表，sizes 為完整路徑到大小的對應。
+
+    先依大小分組（大小來自索引，不需要讀取）；只有大小相同的檔案才計算開頭
+    DEDUPE_HEAD_BYTES 的雜湊，仍然相同且較大的檔案才雜湊完整內容。
+    """
+    buckets = {}
+    for job in jobs:
+        size = sizes[job[0]]
+        if size >= DEDUPE_MIN_BYTES:
+            buckets.setdefault(size, []).append(job)
+    groups = [group for group in buckets.values() if len(group) > 1]
+
+    groups = _split_by_hash(groups, DEDUPE_HEAD_BYTES, workers)
+    # 開頭區塊已涵蓋整個檔案的組不必再讀取
+    complete = [group for group in groups if sizes[group[0][0]] <= DEDUPE_HEAD_BYTES]
+    partial = [group for group in groups if sizes[group[0][0]] > DEDUPE_HEAD_BYTES]
+    groups = complete + _split_by_hash(partial, None, workers)
+
+    duplicates = {}
+    for group in groups:
+        original = group[0][1]
+        for file_path, _ in group[1:]:
+            duplicates[file_path] = original
+    return duplicates
+
+
+def duplicate_section(relative_path, original_path):
+    """重複檔案的參照區段，與一般區段相同以標題與程式碼框包住"""
+    return section_header(relative_path) + f"（與 {original_path} 的內容相同）".encode('utf-8') + SECTION_FOOTER
+
+
+def section_cache_key(relative_path, max_file_bytes=None):
+    """區段快取的鍵：區段內容取決於相對路徑、大小上限與格式版本"""
+    return f"v{SECTION_FORMAT_VERSION}|{max_file_bytes or 0}|{relative_path}"
+
+
+def create_project_summary(input_folder, output_file, selected_files, include_tree, progress=None, success_callback=None, index=None, max_file_bytes=None, read_workers=DEFAULT_READ_WORKERS, cache=None, token_budget=None, budget_mode="drop", timer=None,
+                           tree_max_depth=None, tree_max_entries=DEFAULT_TREE_MAX_ENTRIES, dedupe=False):
+    """
+    根據選擇的檔案列表，串流讀取內容並寫入輸出檔案。
+    output_file 為一個路徑或路徑列表，格式與壓縮方式依副檔名決定（見 output_formats）；
+    每個檔案只讀取一次，再寫入所有輸出。token 預算只適用於文字格式。
+    progress 為 ExportProgress（None 表示不回報）；max_file_bytes 為單檔大小上限
+    （None 或 0 表示不限制）；read_workers 為平行讀取的執行緒數，輸出順序不受影響；
+    cache 為 SectionCache 時，未變更的檔案直接使用快取的區段而不重新讀取；
+    token_budget 與 budget_mode 見 ExportOutput。每個檔案都會回報估算的 token 數。
+    timer 為 StageTimer 時記錄目錄結構、快取、讀取、token 估算與寫入等階段的耗時。
+    tree_max_depth 與 tree_max_entries 限制目錄結構的層數與每個資料夾列出的項目數（見 iter_tree_lines）。
+    dedupe 為 True 時內容相同的檔案只寫入第一個，其餘以「與某路徑的內容相同」的參照取代（見 find_duplicates）。
+    成功時回傳 True，發生錯誤時回傳 False。
+    """
+    if progress is None:
+        progress = ExportProgress()
+    if timer is None:
+        timer = StageTimer()
+    stage = timer.stage
+
+    outputs = [output_file] if isinstance(output_file, str) else list(output_file)
+    try:
+        for path in outputs:
+            check_output(path)
+        text_outputs = [path for path in outputs if output_format(path)[0] == "text"]
+        jsonl_outputs = [path for path in outputs if output_format(path)[0] == "jsonl"]
+        if token_budget and jsonl_outputs:
+            raise ValueError("token 預算只適用於文字格式的輸出，不能與 JSONL 輸出同時使用")
+
+        output = ExportOutput(text_outputs, token_budget, budget_mode)
+        records = []
+        try:
+            records.extend(JsonlWriter(path, OUTPUT_BUFFER_SIZE) for path in jsonl_outputs)
+            progress.log("🚀 處理開始...\n", "info")
+            
+            # --- 1. 寫入完整目錄結構 (Tree) ---
+            if include_tree and text_outputs:
+                progress.log("📂 正在生成專案完整目錄結構...\n", "info")
+                with stage("tree"):
+                    tree_tokens = write_tree(output, input_folder, index, tree_max_depth, tree_max_entries)
+                progress.log(f"✅ 完整目錄結構已生成（約 {tree_tokens:,} tokens）\n\n", "success")
+
+            progress.log("📝 開始處理選定檔案內容...\n", "info_header")
+
+            # --- 2. 依排序順序寫入選擇的檔案（命中快取的直接拼接，其餘小檔案由執行緒池預先讀取） ---
+            jobs = [(file_path, os.path.relpath(file_path, input_folder).replace('\\', '/'))
+                    for file_path in sorted(selected_files)]
+            sizes = {file_path: _file_size(index, file_path, rel) for file_path, rel in jobs}
+
+            # 重複檔案在寫入時改為參照；dedupe_groups 為有重複的第一個檔案，
+            # emitted 記錄每組實際寫入內容的檔案與其 token 數
+            duplicates = {}
+            if dedupe:
+                with stage("dedupe"):
+                    duplicates = find_duplicates(jobs, sizes, read_workers)
+            dedupe_groups = set(duplicates.values())
+            emitted = {}
+            deduped = saved_bytes = saved_tokens = 0
+
+            cache_hits = {}
+            if cache is not None:
+                with stage("cache"):
+                    for file_path, formatted_relative_path in jobs:
+                        if file_path in duplicates:
+                            continue
+                        size = sizes[file_path]
+                        needed = min(size, max_file_bytes) if max_file_bytes else size
+                        row_id = cache.check(file_path, section_cache_key(formatted_relative_path, max_file_bytes), needed)
+                        if row_id is not None:
+                            cache_hits[file_path] = row_id
+
+            meter = ThroughputMeter(len(jobs), sum(sizes.values()))
+            progress.begin(meter.total_files, meter.total_bytes)
+
+            to_read = [job for job in jobs if job[0] not in cache_hits and job[0] not in duplicates]
+            sections = iter_file_sections(to_read, max_file_bytes, read_workers, sizes=sizes)
+            skipped = 0
+            for file_path, formatted_relative_path in jobs:
+                spool = None
+                try:
+                    truncated = False
+                    note = ""
+                    group = duplicates.get(file_path)
+                    if group is None and formatted_relative_path in dedupe_groups:
+                        group = formatted_relative_path
+                    reference = emitted.get(group) if file_path in duplicates else None
+                    if reference is not None:
+                        source = duplicate_section(formatted_relative_path, reference[0])
+                        with stage("tokens"):
+                            tokens = estimate_tokens(source)
+                    elif file_path in cache_hits:
+                        with stage("cache"):
+                            source = cache.load(cache_hits[file_path])
+                        with stage("tokens"):
+                            tokens = estimate_tokens(source)
+                        truncated = bool(max_file_bytes) and sizes[file_path] > max_file_bytes
+                        note = "（快取）"
+                    else:
+                        if file_path in duplicates:
+                            # 同組先前的檔案沒有寫入（略過或讀取失敗），改為直接讀取這個檔案
+                            result = None
+                        else:
+                            with stage("read"):
+                                result = next(sections)[2]
+                        if isinstance(result, Exception):
+                            raise result
+                        cache_key = section_cache_key(formatted_relative_path, max_file_bytes)
+                        to_store = cache is not None and cache.wants(file_path, cache_key)
+                        if result is not None:
+                            source, truncated = result
+                            with stage("tokens"):
+                                tokens = estimate_tokens(source)
+                            if to_store:
+                                with stage("cache"):
+                                    cache.store(file_path, cache_key, source)
+                        elif output.budget is None and not records and not to_store:
+                            # 大檔案邊讀邊寫，讀取、token 估算與寫入無法分開計時
+                            with stage("stream"):
+                                truncated, tokens = output.stream_section(file_path, formatted_relative_path, max_file_bytes)
+                            source = None
+                        else:
+                            # 有預算時先寫入暫存檔取得 token 數，再決定如何寫入；
+                            # 有其他格式的輸出或需要寫入快取時也先寫入暫存檔，讓它們共用同一次讀取
+                            with stage("read"):
+                                spool = tempfile.SpooledTemporaryFile(max_size=PREFETCH_MAX_BYTES)
+                                writer = _CountingWriter(spool)
+                                truncated = write_file_section(writer, file_path, formatted_relative_path, max_file_bytes)
+                            source, tokens = spool, writer.counter.tokens
+                            if to_store:
+                                with stage("cache"):
+                                    cache.store(file_path, cache_key, _source_read(spool, 0, _source_length(spool)))
+
+                    if source is None:
+                        status, written = "written", tokens
+                    else:
+                        with stage("write"):
+                            status, written = output.add_section(source, tokens, formatted_relative_path)
+                            for writer in records:
+                                if reference is not None:
+                                    writer.write_record(formatted_relative_path, sizes[file_path], tokens, False, (),
+                                                        duplicate_of=reference[0])
+                                else:
+                                    writer.write_record(formatted_relative_path, sizes[file_path], tokens, truncated,
+                                                        _section_content(source, formatted_relative_path))
+                    if reference is None and group is not None and group not in emitted and status in ("written", "split"):
+                        emitted[group] = (formatted_relative_path, written)
+                    counts = f"約 {written:,} tokens，累計 {output.total_tokens:,}"
+                    if status == "dropped":
+                        skipped += 1
+                        progress.log(f"⏭️ 超出 token 預算，已略過: {file_path}（約 {tokens:,} tokens）\n", "info")
+                    elif status == "truncated":
+                        progress.log(f"✂️ 已依 token 預算截斷: {file_path}（{counts}）\n", "processed")
+                    elif status == "split":
+                        progress.log(f"🧩 已分段寫入: {file_path}（{counts}）\n", "processed")
+                    elif reference is not None:
+                        deduped += 1
+                        saved_bytes += sizes[file_path]
+                        saved_tokens += max(reference[1] - written, 0)
+                        progress.log(f"🧬 內容與 {reference[0]} 相同，已以參照取代: {file_path}（{counts}）\n", "processed")
+                    elif truncated:
+                        progress.log(f"✂️ 已處理（超過大小上限，已截斷）{note}: {file_path}（{counts}）\n", "processed")
+                    else:
+                        progress.log(f"✅ 已處理{note}: {file_path}（{counts}）\n", "processed")
+                    
+                except Exception as e:
+                    progress.log(f"❌ 讀取失敗: {file_path} - {e}\n", "error")
+                finally:
+                    if spool is not None:
+                        spool.close()
+                    meter.add(1, sizes[file_path])
+                    progress.file_done(file_path, sizes[file_path])
+            sections.close()
+        finally:
+            with stage("write"):
+                output.close()
+                for writer in records:
+                    writer.close()
+
+        if cache is not None:
+            with stage("cache"):
+                cache.finish()
+            progress.log(f"\n{cache.report()}\n", "info")
+
+        summary = f"\n🔢 預估 token 總數: {output.total_tokens:,}"
+        if output.budget is not None:
+            summary += f"（預算 {output.budget:,}，模式 {output.mode}）"
+            if skipped:
+                summary += f"，略過 {skipped:,} 個檔案"
+        progress.log(summary + "\n", "info")
+        if deduped:
+            progress.log(f"🧬 {deduped:,} 個重複檔案以參照取代，節省 {saved_bytes / 1e6:.2f} MB、"
+                         f"約 {saved_tokens:,} tokens\n", "info")
+        progress.log(meter.summary() + "\n", "info")
+
+        paths = output.paths + [writer.path for writer in records]
+        if len(paths) > 1:
+            action = "已分割為" if output.parts > 1 else "已輸出"
+            progress.log(f"\n🎉 處理完成！{action} {len(paths)} 個檔案:\n", "success")
+            for path in paths:
+                progress.log(f"   📄 {path}\n", "success")
+        else:
+            progress.log(f"\n🎉 處理完成！檔案已儲存至: {paths[0]}\n", "success")
+        progress.log("✨ 匯出成功完成！您可以打開檔案查看結果。\n", "success")
+        
+        # 調用成功回調函數
+        if success_callback:
+            success_callback(paths[0])
+        return True
+
+    except Exception as e:
+        error_message = f"發生錯誤: {str(e)}" if str(e) else "發生未知錯誤"
+        progress.log(f"\n❌ {error_message}\n", "error")
+        return False
+
+
+def _matches(rel_path, patterns):
+    """相對路徑或其名稱符合任一 glob 樣式"""
+    name = rel_path.rpartition('/')[2]
+    return any(fnmatch.fnmatch(rel_path, p) or fnmatch.fnmatch(name, p) for p in patterns)
+
+
+def select_files(index, includes=(), selection=None, auto_exclude=True):
+    """
+    從索引收集要匯出的檔案完整路徑。
+
+    排除規則在建立 FileIndex 時即已套用（見 FileIndex 的 exclude_patterns）；
+    includes 不為空時，檔案必須符合其中之一；selection 為 SelectionRules 時
+    一併套用勾選狀態，完全未勾選的子樹不會走訪。
+    auto_exclude 為 True 時，二進位、壓縮後與鎖定檔預設不匯出，
+    除非 selection 中有直接勾選該檔案的規則。
+    """
+    prune = None
+    if selection is not None:
+        prune = lambda rel_path: not selection.has_checked(rel_path)
+
+    selected_files = []
+    for rel_path, dirs, files in index.walk(prune=prune):
+        prefix = rel_path + '/' if rel_path else ''
+        for entry in files:
+            file_rel = prefix + entry.name
+            excluded = auto_exclude and entry.kind in AUTO_EXCLUDED_KINDS
+            if selection is not None:
+                if not selection.is_checked(file_rel, excluded):
+                    continue
+            elif excluded:
+                continue
+            if includes and not _matches(file_rel, includes):
+                continue
+            selected_files.append(index.abs_path(file_rel))
+    return selected_files
+
+
+# kind 為資料夾的 'dir'，或檔案的 'text'、'binary'、'minified'、'lockfile'
+IndexEntry = namedtuple("IndexEntry", ["name", "is_dir", "size", "mtime", "kind"])
+
+
+class FileIndex:
+    """
+    專案資料夾的記憶體索引，以單次 os.scandir 掃描建立。
+
+    每個資料夾只讀取一次，DirEntry 的類型與 stat 結果一併快取，
+    檔案同時判斷是否為二進位、壓縮後或鎖定檔（見 filetypes）；
+    檔案樹、目錄結構文字與選取檔案的收集都共用同一份資料。
+    鍵為以 '/' 分隔的相對路徑（根目錄為 ''）。
+
+    use_ignore_files 為 True 時套用各層資料夾的 .gitignore 與 .ignore；
+    exclude_patterns 為使用者額外指定的樣式（gitignore 語法，優先於忽略檔）。
+    被忽略的項目不會進入索引，被忽略的資料夾因此不會被讀取。
+    """
+    def __init__(self, root_path, use_ignore_files=True, exclude_patterns=()):
+        self.root_path = root_path
+        self.dirs = {}
+        self.use_ignore_files = use_ignore_files
+        self.user_matcher = IgnoreMatcher(exclude_patterns) if exclude_patterns else None
+        self.matchers = {}
+        self.ignored_count = 0
+
+    def abs_path(self, rel_path):
+        """將相對路徑轉為完整路徑"""
+        if not rel_path:
+            return self.root_path
+        return os.path.join(self.root_path, *rel_path.split('/'))
+
+    def _matcher_chain(self, rel_path):
+        """回傳適用於該資料夾的 (忽略檔所在資料夾, IgnoreMatcher)，由深至淺"""
+        chain = []
+        current = rel_path
+        while True:
+            matcher = self.matchers.get(current)
+            if matcher is not None:
+                chain.append((current, matcher))
+            if not current:
+                return chain
+            current = current.rpartition('/')[0]
+
+    def _is_ignored(self, rel_path, name, is_dir, chain):
+        """使用者樣式優先，其次由最深層的忽略檔決定"""
+        if self.user_matcher is not None:
+            verdict = self.user_matcher.match(rel_path, name, is_dir)
+            if verdict is not None:
+                return verdict
+        for base, matcher in chain:
+            verdict = matcher.match(rel_path[len(base) + 1:] if base else rel_path, name, is_dir)
+            if verdict is not None:
+                return verdict
+        return False
+
+    def scan_dir(self, rel_path):
+        """
+        掃描單一資料夾（不遞歸）並存入索引，排除隱藏項目與被忽略的項目。
+        回傳排序後的 (資料夾項目列表, 檔案項目列表)。
+        """
+        dirs = []
+        files = []
+        try:
+            with os.scandir(self.abs_path(rel_path)) as it:
+                entries = list(it)
+        except OSError:
+            entries = []
+
+        if self.use_ignore_files:
+            lines = []
+            for entry in entries:
+                if entry.name in IGNORE_FILES:
+                    lines.append((entry.name, load_ignore_file(entry.path)))
+            if lines:
+                # .ignore 排在 .gitignore 之後，兩者衝突時以 .ignore 為準
+                lines.sort(key=lambda item: IGNORE_FILES.index(item[0]))
+                matcher = IgnoreMatcher([line for _, content in lines for line in content])
+                if not matcher.empty:
+                    self.matchers[rel_path] = matcher
+        chain = self._matcher_chain(rel_path)
+        check = chain or self.user_matcher is not None
+        prefix = rel_path + '/' if rel_path else ''
+
+        for entry in entries:
+            if entry.name.startswith('.'):
+                continue
+            # 與 os.walk 相同，不進入以符號連結指向的資料夾（指向上層的連結會造成無限循環）；
+            # 這類連結也不是檔案，直接略過
+            try:
+                is_dir = entry.is_dir(follow_symlinks=False)
+                if not is_dir and entry.is_symlink() and entry.is_dir():
+                    continue
+            except OSError:
+                is_dir = False
+            if check and self._is_ignored(prefix + entry.name, entry.name, is_dir, chain):
+                self.ignored_count += 1
+                continue
+            if is_dir:
+                dirs.append(IndexEntry(entry.name, True, 0, 0.0, "dir"))
+                continue
+            try:
+                st = entry.stat()
+            except OSError:
+                files.append(IndexEntry(entry.name, False, 0, 0.0, "text"))
+                continue
+            kind = classify_file(entry.path, entry.name, st.st_size, st.st_mtime)
+            files.append(IndexEntry(entry.name, False, st.st_size, st.st_mtime, kind))
+        dirs.sort()
+        files.sort()
+        result = (dirs, files)
+        self.dirs[rel_path] = result
+        return result
+
+    def file_size(self, rel_path):
+        """回傳已掃描檔案的大小；不在索引中時回傳 None"""
+        parent, _, name = rel_path.rpartition('/')
+        listing = self.dirs.get(parent)
+        if listing is None:
+            return None
+        files = listing[1]
+        i = bisect.bisect_left(files, (name,))
+        if i < len(files) and files[i].name == name:
+            return files[i].size
+        return None
+
+    def children(self, rel_path):
+        """取得資料夾內容，尚未掃描時才讀取磁碟"""
+        result = self.dirs.get(rel_path)
+        if result is None:
+            result = self.scan_dir(rel_path)
+        return result
+
+    def invalidate(self, rel_path=None):
+        """
+        清除資料夾及其子資料夾的掃描結果（rel_path 為 None 時清除全部），
+        下次存取時重新讀取磁碟。
+        """
+        if rel_path is None:
+            self.dirs.clear()
+            self.matchers.clear()
+            self.ignored_count = 0
+            return
+        prefix = rel_path + '/' if rel_path else ''
+        for table in (self.dirs, self.matchers):
+            for key in [k for k in table if k == rel_path or k.startswith(prefix)]:
+                del table[key]
+
+    def walk(self, rel_path="", prune=None):
+        """
+        迭代走訪索引，產生 (相對路徑, 資料夾項目列表, 檔案項目列表)。
+        prune(rel_path) 回傳 True 時跳過該資料夾及其子樹。
+        """
+        stack = [rel_path]
+        while stack:
+            current = stack.pop()
+            if prune is not None and prune(current):
+                continue
+            dirs, files = self.children(current)
+            yield current, dirs, files
+            prefix = current + '/' if current else ''
+            stack.extend(prefix + entry.name for entry in reversed(dirs))
+
+
+def scan_tree_worker(index, out_queue, cancel_event):
+    """
+    在背景執行緒中以廣度優先順序將整個資料夾掃描進索引。
+    每個資料夾送出一個 ("batch", (相對路徑, 資料夾項目列表, 檔案項目列表))，
+    結束時送出 ("done", None)，被取消時送出 ("cancelled", None)。
+    """
+    pending = deque([""])
+    while pending:
+        if cancel_event.is_set():
+            out_queue.put(("cancelled", None))
+            return
+        rel_path = pending.popleft()
+        dirs, files = index.scan_dir(rel_path)
+        out_queue.put(("batch", (rel_path, dirs, files)))
+        prefix = rel_path + '/' if rel_path else ''
+        pending.extend(prefix + entry.name for entry in dirs)
+    out_queue.put(("done", None))
+
+
+class SelectionRules:
+    """
+    以路徑前綴規則記錄勾選狀態。
+
+    鍵為相對於專案根目錄、以 '/' 分隔的路徑（根目錄為 ''），值為該路徑及其
+    所有子項目的狀態；較深的規則覆蓋較淺的規則。未展開的子樹因此不需要逐項記錄，
+    切換整個資料夾只是一次規則寫入。鍵另外保存為排序列表，某個資料夾下的所有
+    規則在列表中連續排列，可用 bisect 直接取得範圍。
+    自動排除的檔案（excluded=True）不繼承上層狀態，只有直接設定在該檔案的規則
+    才能將其勾選。
+    """
+    def __init__(self, default=True):
+        self.rules = {"": default}
+        self.keys = [""]
+
+    def copy(self):
+        """回傳獨立的副本（供其他執行緒讀取）"""
+        other = SelectionRules()
+        other.rules = dict(self.rules)
+        other.keys = list(self.keys)
+        return other
+
+    def load(self, rules):
+        """
+        以 {路徑: 是否勾選} 取代所有規則（還原選取設定檔時使用）。
+        規則直接寫入後只排序一次，不必像 set() 一樣逐條插入與清除子規則；
+        沒有根目錄規則時預設為全部勾選。
+        """
+        self.rules = {"": True}
+        self.rules.update(rules)
+        self.keys = sorted(self.rules)
+
+    def _descendant_range(self, rel_path):
+        """回傳該路徑下所有子規則在 keys 中的索引範圍"""
+        if not rel_path:
+            return 1, len(self.keys)
+        # 以 '/' 的下一個字元 '0' 作為上界，涵蓋所有以 rel_path + '/' 開頭的鍵
+        lo = bisect.bisect_left(self.keys, rel_path + '/')
+        hi = bisect.bisect_left(self.keys, rel_path + '0', lo)
+        return lo, hi
+
+    def is_checked(self, rel_path, excluded=False):
+        """沿著路徑往上找到最近的規則"""
+        if excluded:
+            return self.rules.get(rel_path, False)
+        while True:
+            state = self.rules.get(rel_path)
+            if state is not None:
+                return state
+            if not rel_path:
+                return False
+            rel_path = rel_path.rpartition('/')[0]
+
+    def is_partial(self, rel_path):
+        """資料夾下是否有狀態與資料夾本身不同的項目（部分勾選）"""
+        lo, hi = self._descendant_range(rel_path)
+        if lo == hi:
+            return False
+        state = self.is_checked(rel_path)
+        rules, keys = self.rules, self.keys
+        return any(rules[keys[i]] != state for i in range(lo, hi))
+
+    def has_checked(self, rel_path):
+        """該路徑或其下任一項目是否被勾選（用於決定是否需要深入掃描）"""
+        if self.is_checked(rel_path):
+            return True
+        lo, hi = self._descendant_range(rel_path)
+        rules, keys = self.rules, self.keys
+        return any(rules[keys[i]] for i in range(lo, hi))
+
+    def set(self, rel_path, checked, excluded=False):
+        """設定路徑狀態，並移除被其覆蓋的子規則"""
+        lo, hi = self._descendant_range(rel_path)
+        for key in self.keys[lo:hi]:
+            del self.rules[key]
+        del self.keys[lo:hi]
+
+        if not rel_path:
+            self.rules[""] = checked
+            return
+
+        # 與預設狀態（自動排除的檔案為未勾選，其餘為上層狀態）相同時不需要額外規則
+        had_rule = self.rules.pop(rel_path, None) is not None
+        default = False if excluded else self.is_checked(rel_path.rpartition('/')[0])
+        if default != checked:
+            self.rules[rel_path] = checked
+            if not had_rule:
+                bisect.insort(self.keys, rel_path)
+        elif had_rule:
+            del self.keys[bisect.bisect_left(self.keys, rel_path)]
+
+    def set_many(self, files, checked):
+        """
+        一次設定多個檔案的狀態（搜尋結果的全部勾選／取消），files 為 (路徑, 是否自動排除)。
+        檔案沒有子規則，上層規則也不會因此改變，所以直接寫入規則，最後只排序一次。
+        """
+        rules = self.rules
+        for rel_path, excluded in files:
+            default = False if excluded else self.is_checked(rel_path.rpartition('/')[0])
+            if default != checked:
+                rules[rel_path] = checked
+            else:
+                rules.pop(rel_path, None)
+        self.keys = sorted(rules)
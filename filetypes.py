@@ -0,0 +1,112 @@
+"""
+檔案類型判斷：文字、二進位、壓縮後 (minified) 與鎖定檔。
+
+先以檔名與副檔名表判斷，只有無法從名稱判斷的檔案才讀取開頭少量位元組嗅探。
+判斷結果以 (路徑, 大小, 修改時間) 為鍵快取，重新掃描時不必再次讀檔。
+"""
+import os
+
+# 已知的文字檔副檔名與對應圖標（檔案樹也使用這張表）
+FILE_ICONS = {
+    '.py': '🐍', '.js': '🟨', '.ts': '🔷', '.html': '🌐', '.css': '🎨',
+    '.json': '📋', '.md': '📝', '.txt': '📄', '.yml': '⚙️', '.yaml': '⚙️',
+    '.xml': '📊', '.csv': '📈', '.sql': '🗃️', '.sh': '🖥️', '.bat': '⚡',
+    '.php': '🐘', '.java': '☕', '.cpp': '⚡', '.c': '🔧', '.h': '📋',
+    '.go': '🐹', '.rs': '🦀', '.swift': '🍎', '.kt': '🤖', '.dart': '🎯'
+}
+
+# 自動判斷為非文字內容時使用的圖標
+KIND_ICONS = {'binary': '📦', 'minified': '🗜️', 'lockfile': '🔒'}
+
+# 預設不勾選的類型
+AUTO_EXCLUDED_KINDS = frozenset(KIND_ICONS)
+
+BINARY_EXTENSIONS = frozenset([
+    '.png', '.jpg', '.jpeg', '.gif', '.bmp', '.ico', '.icns', '.webp', '.tif', '.tiff', '.psd',
+    '.mp3', '.wav', '.ogg', '.flac', '.mp4', '.mov', '.avi', '.mkv', '.webm',
+    '.zip', '.tar', '.gz', '.tgz', '.bz2', '.xz', '.7z', '.rar', '.zst', '.jar', '.war', '.whl', '.egg',
+    '.pyc', '.pyo', '.pyd', '.so', '.dll', '.dylib', '.exe', '.o', '.a', '.lib', '.obj', '.class',
+    '.wasm', '.bin', '.dat', '.db', '.sqlite', '.sqlite3', '.pkl', '.pickle', '.npy', '.npz',
+    '.parquet', '.feather', '.h5', '.hdf5', '.pt', '.pth', '.onnx', '.ckpt', '.safetensors',
+    '.pdf', '.doc', '.docx', '.xls', '.xlsx', '.ppt', '.pptx', '.odt',
+    '.ttf', '.otf', '.woff', '.woff2', '.eot',
+])
+
+LOCKFILE_NAMES = frozenset([
+    'package-lock.json', 'npm-shrinkwrap.json', 'yarn.lock', 'pnpm-lock.yaml', 'bun.lockb',
+    'poetry.lock', 'pipfile.lock', 'pdm.lock', 'uv.lock', 'cargo.lock', 'gemfile.lock',
+    'composer.lock', 'go.sum', 'flake.lock', 'podfile.lock', 'pubspec.lock', 'mix.lock',
+])
+
+MINIFIED_SUFFIXES = ('.min.js', '.min.css', '.min.mjs', '.js.map', '.css.map')
+
+# 常被壓縮成單行的文字格式：即使副檔名已知仍需嗅探
+MINIFIABLE_EXTENSIONS = frozenset(['.js', '.mjs', '.css', '.json', '.svg', '.map'])
+
+SNIFF_BYTES = 2048
+MINIFIED_MIN_LINE = 1000
+BINARY_CONTROL_RATIO = 0.1
+
+# 除了常見空白控制字元以外的 C0 控制字元
+_CONTROL = bytes(c for c in range(32) if c not in b"\t\n\r\x0c\x08\x1b")
+_DELETE_NON_CONTROL = bytes(c for c in range(256) if c not in _CONTROL)
+
+_verdicts = {}
+
+
+def file_icon(filename, kind="text"):
+    """根據檔案類型返回對應的圖標"""
+    if kind in KIND_ICONS:
+        return KIND_ICONS[kind]
+    ext = os.path.splitext(filename)[1].lower()
+    return FILE_ICONS.get(ext, '📄')
+
+
+def sniff_kind(sample, complete):
+    """
+    依開頭位元組判斷類型。complete 表示 sample 已包含整個檔案。
+    含 NUL 或大量控制字元視為二進位；取樣範圍內幾乎沒有換行視為壓縮後的程式碼。
+    """
+    if not sample:
+        return "text"
+    if b"\0" in sample:
+        return "binary"
+    if len(sample.translate(None, _DELETE_NON_CONTROL)) > len(sample) * BINARY_CONTROL_RATIO:
+        return "binary"
+    if not complete and len(sample) // (sample.count(b"\n") + 1) >= MINIFIED_MIN_LINE:
+        return "minified"
+    return "text"
+
+
+def _classify(path, name, size):
+    lower = name.lower()
+    if lower in LOCKFILE_NAMES:
+        return "lockfile"
+    if lower.endswith(MINIFIED_SUFFIXES):
+        return "minified"
+    ext = os.path.splitext(lower)[1]
+    if ext in BINARY_EXTENSIONS:
+        return "binary"
+    if size == 0 or (ext in FILE_ICONS and ext not in MINIFIABLE_EXTENSIONS):
+        return "text"
+    if ext in MINIFIABLE_EXTENSIONS and size <= SNIFF_BYTES:
+        return "text"
+    try:
+        with open(path, 'rb') as f:
+            sample = f.read(SNIFF_BYTES)
+    except OSError:
+        return "text"
+    return sniff_kind(sample, len(sample) >= size)
+
+
+def classify_file(path, name, size, mtime):
+    """
+    判斷檔案類型，回傳 'text'、'binary'、'minified' 或 'lockfile'。
+    結果依 (路徑, 大小, 修改時間) 快取，檔案未變更時不會再次讀取。
+    """
+    key = (path, size, mtime)
+    kind = _verdicts.get(key)
+    if kind is None:
+        kind = _classify(path, name, size)
+        _verdicts[key] = kind
+    return kind
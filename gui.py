@@ -0,0 +1,1473 @@
+import tkinter as tk
+from tkinter import filedialog, messagebox, scrolledtext, ttk
+import os
+import queue
+import threading
+import time
+from collections import deque
+
+from exporter import (DEFAULT_TREE_MAX_ENTRIES, MIN_TOKEN_BUDGET, ExportProgress, FileIndex, SelectionRules, ThroughputMeter,
+                      create_project_summary, scan_tree_worker, select_files)
+from filetypes import AUTO_EXCLUDED_KINDS, file_icon
+from output_formats import check_output, output_format
+from path_search import build_search_index
+from profiles import delete_profile, load_profiles, load_selection, save_profile
+from section_cache import SectionCache
+from watcher import ExportWatcher
+
+# 背景掃描：每次主迴圈最多處理的批次數與插入的項目數
+SCAN_QUEUE_LIMIT = 200
+SCAN_INSERT_LIMIT = 1000
+SCAN_POLL_MS = 30
+
+# 匯出進度：主迴圈每隔 PROGRESS_FRAME_MS 套用一次累積的事件，記錄區最多保留的行數
+PROGRESS_FRAME_MS = 100
+PROGRESS_LOG_LINES = 1000
+
+# 搜尋框停止輸入多久後才執行搜尋
+SEARCH_DELAY_MS = 150
+
+# token 預算模式的顯示文字
+BUDGET_MODE_LABELS = [
+    ("略過放不下的檔案", "drop"),
+    ("截斷後停止寫入", "truncate"),
+    ("分割為多個檔案", "split"),
+]
+
+class QueueProgress(ExportProgress):
+    """
+    在匯出執行緒中使用：只將事件放入佇列，不直接操作 Tk 控件。
+    主迴圈由 App._drain_progress 定時取出並合併後更新介面。
+    """
+    def __init__(self, events):
+        self.events = events
+
+    def log(self, message, tag="info"):
+        self.events.put(("log", message, tag))
+
+    def begin(self, total_files, total_bytes):
+        self.events.put(("begin", total_files, total_bytes))
+
+    def file_done(self, file_path, nbytes):
+        self.events.put(("file", nbytes))
+
+
+class ModernButton(tk.Button):
+    """現代化按鈕類別"""
+    def __init__(self, parent, **kwargs):
+        # 設定預設樣式
+        default_style = {
+            "font": ("Segoe UI", 11, "bold"),
+            "relief": "flat",
+            "borderwidth": 0,
+            "cursor": "hand2",
+            "padx": 20,
+            "pady": 10
+        }
+        default_style.update(kwargs)
+        super().__init__(parent, **default_style)
+        
+        # 添加懸停效果
+        self.bind("<Enter>", self._on_enter)
+        self.bind("<Leave>", self._on_leave)
+        
+        # 儲存原始顏色
+        self.original_bg = default_style.get("bg", "#007ACC")
+        
+    def _on_enter(self, event):
+        self.config(bg=self._darken_color(self.original_bg))
+        
+    def _on_leave(self, event):
+        self.config(bg=self.original_bg)
+    
+    def _darken_color(self, color):
+        """將顏色變暗"""
+        if color == "#007ACC": return "#005a99"
+        if color == "#28A745": return "#1e7e34"
+        if color == "#6C757D": return "#545b62"
+        if color == "#17A2B8": return "#117a8b"
+        if color == "#DC3545": return "#bd2130"
+        return color
+
+
+class VirtualList(tk.Frame):
+    """
+    只繪製可見列的清單。列數可以是數十萬，每次重繪只建立畫面上看得到的
+    數十個文字項目；每列的文字在繪製時才由 render_row(列號) 產生。
+    """
+    ROW_HEIGHT = 22
+
+    def __init__(self, parent, on_click=None, **kwargs):
+        super().__init__(parent, **kwargs)
+        self.canvas = tk.Canvas(self, bg="#ffffff", highlightthickness=0)
+        self.canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=2, pady=2)
+        self.scrollbar = ttk.Scrollbar(self, orient="vertical", command=self._on_scrollbar)
+        self.scrollbar.pack(side=tk.RIGHT, fill='y')
+
+        self.on_click = on_click
+        self.count = 0
+        self.render_row = None
+        self.top = 0
+        self.canvas.bind("<Configure>", lambda event: self.redraw())
+        self.canvas.bind("<Button-1>", self._on_canvas_click)
+        self.canvas.bind("<MouseWheel>", lambda event: self.scroll(-1 if event.delta > 0 else 1, "units"))
+        self.canvas.bind("<Button-4>", lambda event: self.scroll(-1, "units"))
+        self.canvas.bind("<Button-5>", lambda event: self.scroll(1, "units"))
+
+    def set_rows(self, count, render_row):
+        """以新的列數與繪製函式取代內容，並捲回頂端"""
+        self.count = count
+        self.render_row = render_row
+        self.top = 0
+        self.redraw()
+
+    def _visible_rows(self):
+        return max(1, self.canvas.winfo_height() // self.ROW_HEIGHT)
+
+    def _scroll_to(self, top):
+        self.top = max(0, min(top, self.count - self._visible_rows()))
+        self.redraw()
+
+    def scroll(self, amount, what="units"):
+        step = self._visible_rows() if what == "pages" else 3
+        self._scroll_to(self.top + int(amount) * step)
+
+    def _on_scrollbar(self, action, amount, what=None):
+        if action == "moveto":
+            self._scroll_to(int(float(amount) * self.count))
+        else:
+            self.scroll(amount, what)
+
+    def redraw(self):
+        """重新繪製目前可見的列（勾選狀態改變後也以此更新）"""
+        self.canvas.delete("row")
+        visible = self._visible_rows()
+        end = min(self.count, self.top + visible + 1)
+        for offset, row in enumerate(range(self.top, end)):
+            self.canvas.create_text(6, offset * self.ROW_HEIGHT + self.ROW_HEIGHT // 2,
+                                    text=self.render_row(row), anchor="w",
+                                    font=("Segoe UI", 10), fill="#495057", tags="row")
+        if self.count:
+            self.scrollbar.set(self.top / self.count, min(1.0, (self.top + visible) / self.count))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+    def _on_canvas_click(self, event):
+        row = self.top + event.y // self.ROW_HEIGHT
+        if self.on_click is not None and row < self.count:
+            self.on_click(row)
+
+class App:
+    def __init__(self, root):
+        self.root = root
+        self.root.title("🚀 AI 專案內容匯出工具 v2.0")
+        self.root.geometry("1000x800")
+        self.root.configure(bg="#f8f9fa")
+        
+        # 設定主題樣式
+        self.setup_styles()
+        
+        # 創建主要容器
+        main_container = tk.Frame(root, bg="#f8f9fa")
+        main_container.pack(fill=tk.BOTH, expand=True, padx=20, pady=20)
+        
+        # 標題區域
+        self.create_header(main_container)
+        
+        # 內容區域
+        content_frame = tk.Frame(main_container, bg="#f8f9fa")
+        content_frame.pack(fill=tk.BOTH, expand=True, pady=10)
+        
+        # 左側面板
+        left_panel = tk.Frame(content_frame, bg="#ffffff", relief="solid", borderwidth=1)
+        left_panel.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=(0, 10))
+        
+        # 右側面板
+        right_panel = tk.Frame(content_frame, bg="#ffffff", relief="solid", borderwidth=1)
+        right_panel.pack(side=tk.RIGHT, fill=tk.BOTH, expand=True, padx=(10, 0))
+        
+        self.setup_left_panel(left_panel)
+        self.setup_right_panel(right_panel)
+
+    def setup_styles(self):
+        """設定主題樣式"""
+        style = ttk.Style()
+        style.theme_use('clam')
+        
+        # 配置 Treeview 樣式
+        style.configure("Modern.Treeview", 
+                       background="#ffffff",
+                       foreground="#212529",
+                       fieldbackground="#ffffff",
+                       font=("Segoe UI", 10))
+        
+        style.configure("Modern.Treeview.Heading",
+                       background="#e9ecef",
+                       foreground="#495057",
+                       font=("Segoe UI", 11, "bold"))
+
+        style.configure("Modern.Horizontal.TProgressbar",
+                       background="#28A745",
+                       troughcolor="#e9ecef")
+
+    def create_header(self, parent):
+        """創建標題區域"""
+        header_frame = tk.Frame(parent, bg="#ffffff", height=80, relief="solid", borderwidth=1)
+        header_frame.pack(fill=tk.X, pady=(0, 20))
+        header_frame.pack_propagate(False)
+        
+        # 標題
+        title_label = tk.Label(header_frame, 
+                              text="🤖 AI 專案內容匯出工具", 
+                              font=("Segoe UI", 20, "bold"),
+                              fg="#007ACC",
+                              bg="#ffffff")
+        title_label.pack(side=tk.LEFT, padx=20, pady=20)
+        
+        # 副標題
+        subtitle_label = tk.Label(header_frame,
+                                 text="輕鬆將專案檔案匯出為 LLM 友善格式",
+                                 font=("Segoe UI", 12),
+                                 fg="#6C757D",
+                                 bg="#ffffff")
+        subtitle_label.pack(side=tk.LEFT, padx=(0, 20), pady=25, anchor="s")
+
+    def setup_left_panel(self, parent):
+        """設定左側面板"""
+        # 面板標題
+        panel_title = tk.Label(parent, 
+                              text="📁 專案設定",
+                              font=("Segoe UI", 16, "bold"),
+                              fg="#495057",
+                              bg="#ffffff")
+        panel_title.pack(pady=20, padx=20, anchor="w")
+        
+        # --- 1. 選擇資料夾 ---
+        folder_section = tk.Frame(parent, bg="#ffffff")
+        folder_section.pack(fill=tk.X, padx=20, pady=10)
+        
+        folder_label = tk.Label(folder_section,
+                               text="選擇專案資料夾",
+                               font=("Segoe UI", 12, "bold"),
+                               fg="#495057",
+                               bg="#ffffff")
+        folder_label.pack(anchor="w", pady=(0, 5))
+        
+        folder_input_frame = tk.Frame(folder_section, bg="#ffffff")
+        folder_input_frame.pack(fill=tk.X, pady=(0, 10))
+        
+        self.folder_path = tk.StringVar()
+        folder_entry = tk.Entry(folder_input_frame, 
+                               textvariable=self.folder_path, 
+                               state="readonly",
+                               font=("Segoe UI", 10),
+                               bg="#f8f9fa",
+                               relief="solid",
+                               borderwidth=1)
+        folder_entry.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=(0, 10))
+        
+        browse_btn = ModernButton(folder_input_frame, 
+                                 text="📂 瀏覽",
+                                 command=self.select_folder,
+                                 bg="#007ACC",
+                                 fg="white")
+        browse_btn.pack(side=tk.RIGHT)
+        
+        # --- 2. 檔案樹狀圖 ---
+        tree_section = tk.Frame(parent, bg="#ffffff")
+        tree_section.pack(fill=tk.BOTH, expand=True, padx=20, pady=10)
+        
+        tree_header = tk.Frame(tree_section, bg="#ffffff")
+        tree_header.pack(fill=tk.X, pady=(0, 5))
+
+        tree_label = tk.Label(tree_header,
+                             text="選擇要匯出的檔案",
+                             font=("Segoe UI", 12, "bold"),
+                             fg="#495057",
+                             bg="#ffffff")
+        tree_label.pack(side=tk.LEFT)
+
+        # 背景掃描狀態與取消按鈕
+        self.cancel_scan_btn = ModernButton(tree_header,
+                                           text="⏹ 取消掃描",
+                                           command=self.cancel_scan,
+                                           bg="#6C757D",
+                                           fg="white",
+                                           font=("Segoe UI", 9, "bold"),
+                                           padx=10,
+                                           pady=2,
+                                           state=tk.DISABLED)
+        self.cancel_scan_btn.pack(side=tk.RIGHT)
+
+        self.scan_status = tk.StringVar()
+        scan_status_label = tk.Label(tree_header,
+                                     textvariable=self.scan_status,
+                                     font=("Segoe UI", 9),
+                                     fg="#6C757D",
+                                     bg="#ffffff")
+        scan_status_label.pack(side=tk.RIGHT, padx=(0, 10))
+
+        # 模糊搜尋：輸入內容時以搜尋結果清單取代檔案樹
+        search_frame = tk.Frame(tree_section, bg="#ffffff")
+        search_frame.pack(fill=tk.X, pady=(0, 5))
+
+        search_label = tk.Label(search_frame,
+                                text="🔍",
+                                font=("Segoe UI", 10),
+                                bg="#ffffff",
+                                fg="#495057")
+        search_label.pack(side=tk.LEFT)
+
+        self.search_query = tk.StringVar()
+        search_entry = tk.Entry(search_frame,
+                                textvariable=self.search_query,
+                                font=("Segoe UI", 10),
+                                relief="solid",
+                                borderwidth=1)
+        search_entry.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=(5, 0))
+        search_entry.bind("<Escape>", lambda event: self.search_query.set(""))
+        self.search_query.trace_add("write", lambda *args: self._schedule_search())
+
+        self.tree_container = tk.Frame(tree_section, bg="#e9ecef", relief="solid", borderwidth=1)
+        self.tree_container.pack(fill=tk.BOTH, expand=True, pady=(0, 10))
+
+        self.results_frame = tk.Frame(tree_section, bg="#ffffff")
+        results_header = tk.Frame(self.results_frame, bg="#ffffff")
+        results_header.pack(fill=tk.X, pady=(0, 5))
+
+        self.search_status = tk.StringVar()
+        search_status_label = tk.Label(results_header,
+                                       textvariable=self.search_status,
+                                       font=("Segoe UI", 9),
+                                       fg="#6C757D",
+                                       bg="#ffffff")
+        search_status_label.pack(side=tk.LEFT)
+
+        uncheck_matches_btn = ModernButton(results_header,
+                                           text="❌ 全部取消",
+                                           command=lambda: self.check_matches(False),
+                                           bg="#6C757D",
+                                           fg="white",
+                                           font=("Segoe UI", 9, "bold"),
+                                           padx=10,
+                                           pady=2)
+        uncheck_matches_btn.pack(side=tk.RIGHT)
+
+        check_matches_btn = ModernButton(results_header,
+                                         text="✅ 全部勾選",
+                                         command=lambda: self.check_matches(True),
+                                         bg="#007ACC",
+                                         fg="white",
+                                         font=("Segoe UI", 9, "bold"),
+                                         padx=10,
+                                         pady=2)
+        check_matches_btn.pack(side=tk.RIGHT, padx=(0, 5))
+
+        self.results_list = VirtualList(self.results_frame,
+                                        on_click=self._toggle_match,
+                                        bg="#e9ecef",
+                                        relief="solid",
+                                        borderwidth=1)
+        self.results_list.pack(fill=tk.BOTH, expand=True)
+
+        # 搜尋索引在掃描完成後第一次搜尋時建立，目錄結構改變時重建
+        self.search_index = None
+        self.search_matches = []
+        self.search_job = None
+
+        self.tree = ttk.Treeview(self.tree_container, show="tree", style="Modern.Treeview")
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=2, pady=2)
+
+        # 滾動條
+        tree_scrollbar = ttk.Scrollbar(self.tree_container, orient="vertical", command=self.tree.yview)
+        tree_scrollbar.pack(side=tk.RIGHT, fill='y')
+        self.tree.configure(yscrollcommand=tree_scrollbar.set)
+        
+        # 儲存 Treeview item 的狀態：item_paths 為 iid -> 相對路徑，
+        # 勾選狀態則以路徑前綴規則記錄在 selection 中。
+        # 標籤、目前顯示的勾選標記、父子關係與展開狀態都保存在 Python 端，
+        # 重繪時不需要向 Tk 查詢
+        self.selection = SelectionRules()
+        self.item_paths = {}
+        self.item_labels = {}
+        self.item_marks = {}
+        self.item_parents = {}
+        self.child_items = {}
+        self.open_items = set()
+        self.loaded_dirs = set()
+        self.excluded_paths = set()
+        self.tree.bind("<Button-1>", self._on_tree_click)
+        self.tree.bind("<<TreeviewOpen>>", self._on_tree_open)
+        self.tree.bind("<<TreeviewClose>>", self._on_tree_close)
+
+        # 背景掃描建立的檔案索引，以及待插入 Treeview 的項目
+        self.root_iid = None
+        self.index = None
+        self.insert_backlog = deque()
+        self.scan_queue = None
+        self.scan_cancel = None
+        # 掃描完整結束（未被取消）時為 True，此時索引涵蓋所有資料夾
+        self.scan_complete = False
+        self.scanned_files = 0
+        self.drain_job = None
+
+        # 選取設定檔：輸入名稱後儲存目前的勾選，或從選單還原
+        profile_frame = tk.Frame(tree_section, bg="#ffffff")
+        profile_frame.pack(fill=tk.X, pady=(0, 10))
+        self.profile_frame = profile_frame
+
+        profile_label = tk.Label(profile_frame,
+                                 text="💾 選取設定檔:",
+                                 font=("Segoe UI", 10),
+                                 bg="#ffffff",
+                                 fg="#495057")
+        profile_label.pack(side=tk.LEFT)
+
+        self.profile_name = tk.StringVar()
+        self.profile_box = ttk.Combobox(profile_frame,
+                                        textvariable=self.profile_name,
+                                        width=20)
+        self.profile_box.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=(5, 10))
+        self.profile_box.bind("<<ComboboxSelected>>", lambda event: self.apply_profile())
+        self.profile_names = []
+
+        delete_profile_btn = ModernButton(profile_frame,
+                                          text="🗑 刪除",
+                                          command=self.delete_profile,
+                                          bg="#6C757D",
+                                          fg="white",
+                                          font=("Segoe UI", 9, "bold"),
+                                          padx=10,
+                                          pady=2)
+        delete_profile_btn.pack(side=tk.RIGHT)
+
+        save_profile_btn = ModernButton(profile_frame,
+                                        text="💾 儲存",
+                                        command=self.save_profile,
+                                        bg="#007ACC",
+                                        fg="white",
+                                        font=("Segoe UI", 9, "bold"),
+                                        padx=10,
+                                        pady=2)
+        save_profile_btn.pack(side=tk.RIGHT, padx=(0, 5))
+        
+        # 選項
+        options_frame = tk.Frame(tree_section, bg="#ffffff")
+        options_frame.pack(fill=tk.X)
+        
+        self.include_tree = tk.BooleanVar(value=True)
+        tree_checkbox = tk.Checkbutton(options_frame,
+                                     text="📋 在開頭插入完整專案目錄結構",
+                                     variable=self.include_tree,
+                                     font=("Segoe UI", 10),
+                                     bg="#ffffff",
+                                     fg="#495057")
+        tree_checkbox.pack(anchor="w")
+
+        tree_limit_frame = tk.Frame(options_frame, bg="#ffffff")
+        tree_limit_frame.pack(anchor="w", padx=(24, 0))
+
+        tree_depth_label = tk.Label(tree_limit_frame,
+                                    text="層數上限:",
+                                    font=("Segoe UI", 9),
+                                    bg="#ffffff",
+                                    fg="#6C757D")
+        tree_depth_label.pack(side=tk.LEFT)
+
+        self.tree_depth = tk.StringVar(value="0")
+        tree_depth_entry = tk.Entry(tree_limit_frame,
+                                    textvariable=self.tree_depth,
+                                    width=5,
+                                    font=("Segoe UI", 9),
+                                    relief="solid",
+                                    borderwidth=1)
+        tree_depth_entry.pack(side=tk.LEFT, padx=(5, 10))
+
+        tree_entries_label = tk.Label(tree_limit_frame,
+                                      text="每個資料夾最多列出 (0 = 不限制):",
+                                      font=("Segoe UI", 9),
+                                      bg="#ffffff",
+                                      fg="#6C757D")
+        tree_entries_label.pack(side=tk.LEFT)
+
+        self.tree_max_entries = tk.StringVar(value=str(DEFAULT_TREE_MAX_ENTRIES))
+        tree_entries_entry = tk.Entry(tree_limit_frame,
+                                      textvariable=self.tree_max_entries,
+                                      width=7,
+                                      font=("Segoe UI", 9),
+                                      relief="solid",
+                                      borderwidth=1)
+        tree_entries_entry.pack(side=tk.LEFT, padx=(5, 0))
+
+        size_limit_frame = tk.Frame(options_frame, bg="#ffffff")
+        size_limit_frame.pack(anchor="w", pady=(5, 0))
+
+        size_limit_label = tk.Label(size_limit_frame,
+                                    text="✂️ 單檔大小上限 (KB，0 = 不限制):",
+                                    font=("Segoe UI", 10),
+                                    bg="#ffffff",
+                                    fg="#495057")
+        size_limit_label.pack(side=tk.LEFT)
+
+        self.max_file_kb = tk.StringVar(value="0")
+        size_limit_entry = tk.Entry(size_limit_frame,
+                                    textvariable=self.max_file_kb,
+                                    width=8,
+                                    font=("Segoe UI", 10),
+                                    relief="solid",
+                                    borderwidth=1)
+        size_limit_entry.pack(side=tk.LEFT, padx=(5, 0))
+
+        budget_frame = tk.Frame(options_frame, bg="#ffffff")
+        budget_frame.pack(anchor="w", pady=(5, 0))
+
+        budget_label = tk.Label(budget_frame,
+                                text="🔢 Token 預算 (0 = 不限制):",
+                                font=("Segoe UI", 10),
+                                bg="#ffffff",
+                                fg="#495057")
+        budget_label.pack(side=tk.LEFT)
+
+        self.token_budget = tk.StringVar(value="0")
+        budget_entry = tk.Entry(budget_frame,
+                                textvariable=self.token_budget,
+                                width=10,
+                                font=("Segoe UI", 10),
+                                relief="solid",
+                                borderwidth=1)
+        budget_entry.pack(side=tk.LEFT, padx=(5, 10))
+
+        self.budget_mode = tk.StringVar(value=BUDGET_MODE_LABELS[0][0])
+        budget_mode_box = ttk.Combobox(budget_frame,
+                                       textvariable=self.budget_mode,
+                                       values=[label for label, _ in BUDGET_MODE_LABELS],
+                                       state="readonly",
+                                       width=16)
+        budget_mode_box.pack(side=tk.LEFT)
+
+        self.use_cache = tk.BooleanVar(value=False)
+        cache_checkbox = tk.Checkbutton(options_frame,
+                                      text="♻️ 使用快取加速重複匯出（只重新讀取有變更的檔案）",
+                                      variable=self.use_cache,
+                                      font=("Segoe UI", 10),
+                                      bg="#ffffff",
+                                      fg="#495057")
+        cache_checkbox.pack(anchor="w", pady=(5, 0))
+
+        self.dedupe = tk.BooleanVar(value=False)
+        dedupe_checkbox = tk.Checkbutton(options_frame,
+                                       text="🧬 內容相同的檔案只寫入一次（其餘以參照取代）",
+                                       variable=self.dedupe,
+                                       font=("Segoe UI", 10),
+                                       bg="#ffffff",
+                                       fg="#495057")
+        dedupe_checkbox.pack(anchor="w", pady=(5, 0))
+
+        # 以同一次讀取額外輸出 JSONL（與主要輸出同名、同壓縮方式）
+        self.also_jsonl = tk.BooleanVar(value=False)
+        jsonl_checkbox = tk.Checkbutton(options_frame,
+                                      text="🧾 同時輸出 JSONL（每行一個檔案記錄，供其他工具讀取）",
+                                      variable=self.also_jsonl,
+                                      font=("Segoe UI", 10),
+                                      bg="#ffffff",
+                                      fg="#495057")
+        jsonl_checkbox.pack(anchor="w", pady=(5, 0))
+
+        # 忽略規則變更後重新掃描目前的資料夾
+        self.use_gitignore = tk.BooleanVar(value=True)
+        gitignore_checkbox = tk.Checkbutton(options_frame,
+                                          text="🙈 套用專案中的 .gitignore / .ignore 規則",
+                                          variable=self.use_gitignore,
+                                          command=self._rescan,
+                                          font=("Segoe UI", 10),
+                                          bg="#ffffff",
+                                          fg="#495057")
+        gitignore_checkbox.pack(anchor="w", pady=(5, 0))
+
+        exclude_frame = tk.Frame(options_frame, bg="#ffffff")
+        exclude_frame.pack(anchor="w", fill=tk.X, pady=(5, 0))
+
+        exclude_label = tk.Label(exclude_frame,
+                                 text="🚫 排除樣式 (以逗號分隔，Enter 套用):",
+                                 font=("Segoe UI", 10),
+                                 bg="#ffffff",
+                                 fg="#495057")
+        exclude_label.pack(side=tk.LEFT)
+
+        self.exclude_patterns = tk.StringVar(value="")
+        exclude_entry = tk.Entry(exclude_frame,
+                                 textvariable=self.exclude_patterns,
+                                 font=("Segoe UI", 10),
+                                 relief="solid",
+                                 borderwidth=1)
+        exclude_entry.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=(5, 0))
+        exclude_entry.bind("<Return>", lambda event: self._rescan())
+        
+        # --- 3. 開始按鈕（背景掃描進行中時停用，見 _populate_tree） ---
+        self.start_btn = ModernButton(parent,
+                               text="🚀 開始匯出",
+                               command=self.start_processing,
+                               bg="#28A745",
+                               fg="white",
+                               font=("Segoe UI", 14, "bold"))
+        self.start_btn.pack(pady=(20, 8), padx=20, fill=tk.X)
+
+        # 監看模式：檔案變更時自動更新匯出檔案
+        self.watch_btn = ModernButton(parent,
+                                      text="👀 監看並自動更新",
+                                      command=self.toggle_watch,
+                                      bg="#17A2B8",
+                                      fg="white",
+                                      font=("Segoe UI", 11, "bold"))
+        self.watch_btn.pack(pady=(0, 20), padx=20, fill=tk.X)
+        self.watcher = None
+        self.watch_selection = None
+
+    def setup_right_panel(self, parent):
+        """設定右側面板"""
+        # 面板標題
+        panel_title = tk.Label(parent,
+                              text="📊 處理進度",
+                              font=("Segoe UI", 16, "bold"),
+                              fg="#495057",
+                              bg="#ffffff")
+        panel_title.pack(pady=20, padx=20, anchor="w")
+        
+        # 進度顯示區域
+        progress_container = tk.Frame(parent, bg="#ffffff")
+        progress_container.pack(fill=tk.BOTH, expand=True, padx=20, pady=(0, 20))
+
+        # 進度條與處理速度
+        self.progress_bar = ttk.Progressbar(progress_container,
+                                            style="Modern.Horizontal.TProgressbar",
+                                            mode="determinate")
+        self.progress_bar.pack(fill=tk.X)
+
+        self.progress_stats = tk.StringVar()
+        progress_stats_label = tk.Label(progress_container,
+                                        textvariable=self.progress_stats,
+                                        font=("Segoe UI", 9),
+                                        fg="#6C757D",
+                                        bg="#ffffff",
+                                        anchor="w")
+        progress_stats_label.pack(fill=tk.X, pady=(2, 8))
+
+        # 匯出執行緒送出的進度事件
+        self.progress_events = None
+        self.progress_job = None
+        self.meter = None
+        # "saved" 與 "end" 可能在不同畫面取出，完成前保留已儲存的路徑
+        self.saved_file = None
+        
+        # 進度文字區域
+        text_container = tk.Frame(progress_container, bg="#f8f9fa", relief="solid", borderwidth=1)
+        text_container.pack(fill=tk.BOTH, expand=True)
+        
+        self.progress_text = scrolledtext.ScrolledText(text_container,
+                                                     wrap=tk.WORD,
+                                                     font=("Consolas", 10),
+                                                     bg="#ffffff",
+                                                     fg="#212529",
+                                                     relief="flat",
+                                                     borderwidth=0)
+        self.progress_text.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        
+        # 設定不同訊息的顏色標籤
+        self.progress_text.tag_config("info", foreground="#007ACC", font=("Consolas", 10))
+        self.progress_text.tag_config("info_header", foreground="#495057", font=("Consolas", 10, "bold"))
+        self.progress_text.tag_config("success", foreground="#28A745", font=("Consolas", 10, "bold"))
+        self.progress_text.tag_config("processed", foreground="#212529", font=("Consolas", 9))
+        self.progress_text.tag_config("error", foreground="#DC3545", font=("Consolas", 10, "bold"))
+        
+        # 初始提示
+        welcome_text = """🎯 歡迎使用 AI 專案內容匯出工具！
+
+📋 使用步驟：
+1️⃣ 點擊「瀏覽」選擇您的專案資料夾
+2️⃣ 在檔案樹中勾選要匯出的檔案
+3️⃣ 點擊「開始匯出」按鈕
+4️⃣ 選擇儲存位置，完成匯出"""
+        
+        self.progress_text.insert(tk.END, welcome_text, "info")
+
+    def _populate_tree(self, start_path):
+        """
+        重設 Treeview 並在背景執行緒中掃描資料夾。
+        掃描結果由主迴圈分批收取；只有展開的資料夾才會插入子項目。
+        """
+        self.stop_watch()
+        for i in self.tree.get_children():
+            self.tree.delete(i)
+        self.item_paths.clear()
+        self.item_labels.clear()
+        self.item_marks.clear()
+        self.item_parents.clear()
+        self.child_items.clear()
+        self.open_items.clear()
+        self.loaded_dirs.clear()
+        self.excluded_paths.clear()
+        self.cancel_scan()
+        self.insert_backlog.clear()
+        patterns = [p.strip() for p in self.exclude_patterns.get().split(",") if p.strip()]
+        self.index = FileIndex(start_path, self.use_gitignore.get(), patterns)
+        self.selection = SelectionRules()
+        self._load_profile_names()
+        self._invalidate_search()
+
+        root_name = os.path.basename(start_path)
+        self.root_iid = self.tree.insert("", "end", text=f"✅ 📁 {root_name}", open=True)
+        self.item_paths[self.root_iid] = ""
+        self.item_labels[self.root_iid] = f"📁 {root_name}"
+        self.item_marks[self.root_iid] = '✅'
+        self.open_items.add(self.root_iid)
+
+        self.scanned_files = 0
+        self.scan_complete = False
+        self.scan_queue = queue.Queue()
+        self.scan_cancel = threading.Event()
+        worker = threading.Thread(target=scan_tree_worker,
+                                  args=(self.index, self.scan_queue, self.scan_cancel),
+                                  daemon=True)
+        worker.start()
+        self.scan_status.set("🔍 已掃描 0 個檔案")
+        self.cancel_scan_btn.config(state=tk.NORMAL)
+        self.start_btn.config(state=tk.DISABLED)
+        self._schedule_drain()
+
+    def _rescan(self):
+        """以目前的忽略設定重新掃描已選擇的資料夾"""
+        folder = self.folder_path.get()
+        if folder:
+            self._populate_tree(folder)
+
+    def _scan_summary(self):
+        ignored = self.index.ignored_count if self.index is not None else 0
+        if ignored:
+            return f"{self.scanned_files:,} 個檔案，已忽略 {ignored:,} 個項目"
+        return f"{self.scanned_files:,} 個檔案"
+
+    def cancel_scan(self):
+        """中止目前的背景掃描；已收到的結果仍保留，未掃描的資料夾在展開時再讀取"""
+        if self.scan_cancel is not None and not self.scan_cancel.is_set():
+            self.scan_cancel.set()
+            self._finish_scan(f"⏹ 掃描已取消（已掃描 {self._scan_summary()}）")
+
+    def _finish_scan(self, status):
+        """結束掃描狀態；舊佇列中剩餘的訊息直接丟棄"""
+        self.scan_queue = None
+        self.scan_status.set(status)
+        self.cancel_scan_btn.config(state=tk.DISABLED)
+        self.start_btn.config(state=tk.NORMAL)
+        if self.root_iid in self.item_paths:
+            self._load_children(self.root_iid)
+        self._invalidate_search()
+
+    def _schedule_drain(self):
+        if self.drain_job is None:
+            self.drain_job = self.root.after(SCAN_POLL_MS, self._drain_scan)
+
+    def _drain_scan(self):
+        """在主迴圈中收取掃描結果並插入待處理的 Treeview 項目，每次處理量有上限"""
+        self.drain_job = None
+
+        # --- 1. 收取背景掃描的批次 ---
+        for _ in range(SCAN_QUEUE_LIMIT):
+            if self.scan_queue is None:
+                break
+            try:
+                kind, payload = self.scan_queue.get_nowait()
+            except queue.Empty:
+                break
+            if kind == "batch":
+                rel_path, dirs, files = payload
+                self.scanned_files += len(files)
+                if rel_path == "":
+                    self._load_children(self.root_iid)
+            elif kind == "done":
+                self.scan_complete = True
+                self._finish_scan(f"✅ 掃描完成，共 {self._scan_summary()}")
+            else:
+                self._finish_scan(f"⏹ 掃描已取消（已掃描 {self._scan_summary()}）")
+
+        if self.scan_queue is not None:
+            self.scan_status.set(f"🔍 已掃描 {self._scan_summary()}")
+
+        # --- 2. 分批插入 Treeview 項目 ---
+        budget = SCAN_INSERT_LIMIT
+        while budget > 0 and self.insert_backlog:
+            job = self.insert_backlog[0]
+            parent_iid, prefix, items, index = job
+            end = min(len(items), index + budget)
+            for entry in items[index:end]:
+                self._insert_item(parent_iid, prefix + entry.name, entry)
+            budget -= end - index
+            if end == len(items):
+                self.insert_backlog.popleft()
+            else:
+                job[3] = end
+
+        if self.scan_queue is not None or self.insert_backlog:
+            self._schedule_drain()
+
+    def _load_children(self, iid):
+        """將資料夾的直接子項目排入插入佇列；子資料夾以佔位項目顯示展開箭頭"""
+        if iid in self.loaded_dirs:
+            return
+        self.loaded_dirs.add(iid)
+
+        # 移除佔位項目
+        for child in self.tree.get_children(iid):
+            self.tree.delete(child)
+
+        rel_path = self.item_paths[iid]
+        prefix = rel_path + '/' if rel_path else ''
+        scanned = rel_path in self.index.dirs
+        dirs, files = self.index.children(rel_path)
+        items = dirs + files
+        if not scanned and self.scan_queue is None:
+            # 掃描取消後展開的資料夾才加入索引，搜尋索引需要重建
+            self._invalidate_search()
+        if items:
+            self.insert_backlog.append([iid, prefix, items, 0])
+            self._schedule_drain()
+
+    def _insert_item(self, parent_iid, rel_path, entry, position="end"):
+        """插入單一 Treeview 項目並回傳其 iid；二進位、壓縮後與鎖定檔預設不勾選"""
+        if entry.kind in AUTO_EXCLUDED_KINDS:
+            self.excluded_paths.add(rel_path)
+        mark = self._item_mark(rel_path)
+        icon = '📁' if entry.is_dir else self._get_file_icon(entry.name, entry.kind)
+        label = f"{icon} {entry.name}"
+        iid = self.tree.insert(parent_iid, position, text=f"{mark} {label}", open=False)
+        self.item_paths[iid] = rel_path
+        self.item_labels[iid] = label
+        self.item_marks[iid] = mark
+        self.item_parents[iid] = parent_iid
+        self.child_items.setdefault(parent_iid, []).append(iid)
+        if entry.is_dir:
+            self.tree.insert(iid, "end", text="…")
+        return iid
+
+    def _on_tree_open(self, event):
+        """展開資料夾時才載入其內容，已載入的子項目依目前的勾選狀態重繪"""
+        iid = self.tree.focus()
+        if iid in self.item_paths:
+            self.open_items.add(iid)
+            self._load_children(iid)
+            self._repaint_visible(iid)
+
+    def _on_tree_close(self, event):
+        self.open_items.discard(self.tree.focus())
+
+    def _get_file_icon(self, filename, kind="text"):
+        """根據檔案類型返回對應的圖標"""
+        return file_icon(filename, kind)
+
+    def _is_checked(self, rel_path):
+        return self.selection.is_checked(rel_path, rel_path in self.excluded_paths)
+
+    def _item_mark(self, rel_path):
+        """勾選標記：✅ 已選擇、❌ 未選擇、➖ 資料夾內部分選擇"""
+        if self.selection.is_partial(rel_path):
+            return '➖'
+        return '✅' if self._is_checked(rel_path) else '❌'
+
+    def _update_tree_item_visual(self, iid):
+        """更新單個 Treeview item 的複選框外觀；標記未改變時不呼叫 Tk"""
+        mark = self._item_mark(self.item_paths[iid])
+        if self.item_marks.get(iid) != mark:
+            self.item_marks[iid] = mark
+            self.tree.item(iid, text=f"{mark} {self.item_labels[iid]}")
+
+    def _repaint_visible(self, iid):
+        """
+        重繪 iid 及其可見的子項目。收合的資料夾不深入，
+        其子項目在展開時（_on_tree_open）才依當時的狀態重繪。
+        """
+        stack = [iid]
+        while stack:
+            item = stack.pop()
+            self._update_tree_item_visual(item)
+            if item in self.open_items:
+                stack.extend(self.child_items.get(item, ()))
+
+    def _toggle_check(self, iid):
+        """
+        切換一個 item 的選中狀態。子樹狀態由規則繼承，切換只寫入一條規則；
+        之後只重繪可見的子項目與上層資料夾（部分選擇標記可能改變）。
+        部分選擇的資料夾點擊後變為全選。
+        """
+        rel_path = self.item_paths[iid]
+        excluded = rel_path in self.excluded_paths
+        checked = self.selection.is_partial(rel_path) or not self.selection.is_checked(rel_path, excluded)
+        self.selection.set(rel_path, checked, excluded)
+
+        self._repaint_visible(iid)
+        parent = self.item_parents.get(iid)
+        while parent is not None:
+            self._update_tree_item_visual(parent)
+            parent = self.item_parents.get(parent)
+        self._selection_changed()
+
+    def _selection_changed(self):
+        """勾選改變後通知監看執行緒（以副本取代，避免跨執行緒讀取正在修改的規則）"""
+        if self.watcher is not None:
+            self.watch_selection = self.selection.copy()
+            self.watcher.refresh()
+
+    def _load_profile_names(self):
+        """讀取目前專案的選取設定檔名稱到下拉選單"""
+        names = []
+        folder = self.folder_path.get()
+        if folder:
+            try:
+                names = sorted(load_profiles(folder))
+            except ValueError as e:
+                self.progress_text.insert(tk.END, f"⚠️ {e}\n", "error")
+        self.profile_names = names
+        self.profile_box.config(values=names)
+
+    def apply_profile(self):
+        """
+        還原選取設定檔：規則一次載入，只重繪可見的項目，
+        收合資料夾中已載入的項目在展開時才依新規則重繪。
+        """
+        folder = self.folder_path.get()
+        name = self.profile_name.get().strip()
+        if not folder or self.root_iid is None or not name:
+            return
+        try:
+            selection = load_selection(folder, name)
+        except KeyError:
+            messagebox.showwarning("⚠️ 警告", f"找不到選取設定檔「{name}」！")
+            return
+        except ValueError as e:
+            messagebox.showerror("❌ 錯誤", str(e))
+            return
+
+        self.selection = selection
+        self._repaint_visible(self.root_iid)
+        self._selection_changed()
+        if self.scan_queue is not None:
+            # 掃描進行中不走訪索引，避免在主執行緒讀取尚未掃描的資料夾
+            message = f"\n📂 已套用選取設定檔「{name}」\n"
+        else:
+            count = len(self._get_selected_files())
+            message = f"\n📂 已套用選取設定檔「{name}」，共選擇 {count:,} 個檔案\n"
+        self.progress_text.insert(tk.END, message, "success")
+        self.progress_text.see(tk.END)
+
+    def save_profile(self):
+        folder = self.folder_path.get()
+        if not folder:
+            messagebox.showwarning("⚠️ 警告", "請先選擇一個資料夾！")
+            return
+        name = self.profile_name.get().strip()
+        if not name:
+            messagebox.showwarning("⚠️ 警告", "請在選取設定檔欄位輸入名稱！")
+            return
+        if name in self.profile_names and \
+                not messagebox.askyesno("💾 儲存", f"要覆蓋選取設定檔「{name}」嗎？"):
+            return
+        try:
+            save_profile(folder, name, self.selection)
+        except (OSError, ValueError) as e:
+            messagebox.showerror("❌ 錯誤", f"無法儲存選取設定檔: {e}")
+            return
+        self._load_profile_names()
+        self.progress_text.insert(tk.END, f"\n💾 已儲存選取設定檔「{name}」\n", "success")
+        self.progress_text.see(tk.END)
+
+    def delete_profile(self):
+        folder = self.folder_path.get()
+        name = self.profile_name.get().strip()
+        if not folder or name not in self.profile_names:
+            return
+        if not messagebox.askyesno("🗑 刪除", f"要刪除選取設定檔「{name}」嗎？"):
+            return
+        try:
+            delete_profile(folder, name)
+        except (OSError, ValueError) as e:
+            messagebox.showerror("❌ 錯誤", f"無法刪除選取設定檔: {e}")
+            return
+        self.profile_name.set("")
+        self._load_profile_names()
+
+    def _on_tree_click(self, event):
+        """處理 Treeview 上的點擊事件"""
+        iid = self.tree.identify_row(event.y)
+        if not iid or iid not in self.item_paths:
+            return
+        # 點擊展開箭頭時只展開，不切換勾選
+        if self.tree.identify_element(event.x, event.y).endswith("indicator"):
+            return
+        if self.tree.identify_column(event.x) == '#0':
+            self._toggle_check(iid)
+
+    def _schedule_search(self):
+        """停止輸入 SEARCH_DELAY_MS 後才搜尋，連續輸入時只執行最後一次"""
+        if self.search_job is not None:
+            self.root.after_cancel(self.search_job)
+        self.search_job = self.root.after(SEARCH_DELAY_MS, self._run_search)
+
+    def _invalidate_search(self):
+        """目錄結構改變後丟棄搜尋索引，有搜尋內容時重新搜尋"""
+        self.search_index = None
+        if self.search_query.get().strip():
+            self._schedule_search()
+
+    def _run_search(self):
+        """
+        執行模糊搜尋並以虛擬清單顯示結果；搜尋內容清空時換回檔案樹。
+        搜尋索引在掃描完成後的第一次搜尋時才建立。
+        """
+        self.search_job = None
+        query = self.search_query.get().strip()
+        if not query:
+            self.search_matches = []
+            if self.results_frame.winfo_manager():
+                self.results_frame.pack_forget()
+                self.tree_container.pack(fill=tk.BOTH, expand=True, pady=(0, 10), before=self.profile_frame)
+            return
+        if not self.results_frame.winfo_manager():
+            self.tree_container.pack_forget()
+            self.results_frame.pack(fill=tk.BOTH, expand=True, pady=(0, 10), before=self.profile_frame)
+
+        if self.index is None or self.scan_queue is not None:
+            self.search_matches = []
+            self.results_list.set_rows(0, None)
+            self.search_status.set("⏳ 掃描完成後即可搜尋" if self.index is not None else "請先選擇資料夾")
+            return
+
+        # 掃描被取消時只搜尋已掃描的資料夾，不在主執行緒讀取其餘資料夾
+        start = time.perf_counter()
+        if self.search_index is None:
+            self.search_index = build_search_index(self.index, scanned_only=not self.scan_complete)
+        self.search_matches = self.search_index.search(query)
+        elapsed = (time.perf_counter() - start) * 1000
+        self.results_list.set_rows(len(self.search_matches), self._match_label)
+        partial = "" if self.scan_complete else "，掃描已取消，只搜尋已掃描的資料夾"
+        self.search_status.set(f"{len(self.search_matches):,} 個符合的檔案（{elapsed:.0f} ms{partial}）")
+
+    def _match_info(self, row):
+        """回傳搜尋結果第 row 列的 (相對路徑, 類型, 是否自動排除)"""
+        i = self.search_matches[row]
+        kind = self.search_index.kinds[i]
+        return self.search_index.paths[i], kind, kind in AUTO_EXCLUDED_KINDS
+
+    def _match_label(self, row):
+        rel_path, kind, excluded = self._match_info(row)
+        mark = '✅' if self.selection.is_checked(rel_path, excluded) else '❌'
+        return f"{mark} {self._get_file_icon(rel_path.rpartition('/')[2], kind)} {rel_path}"
+
+    def _toggle_match(self, row):
+        """點擊搜尋結果時切換該檔案的勾選"""
+        rel_path, _, excluded = self._match_info(row)
+        self.selection.set(rel_path, not self.selection.is_checked(rel_path, excluded), excluded)
+        self._matches_changed()
+
+    def check_matches(self, checked):
+        """
+        勾選或取消所有搜尋結果。規則一次寫入（SelectionRules.set_many），
+        不逐項操作 Treeview，之後只重繪檔案樹中可見的項目與清單中可見的列。
+        """
+        if not self.search_matches:
+            return
+        start = time.perf_counter()
+        paths, kinds = self.search_index.paths, self.search_index.kinds
+        self.selection.set_many([(paths[i], kinds[i] in AUTO_EXCLUDED_KINDS) for i in self.search_matches], checked)
+        self._matches_changed()
+        elapsed = (time.perf_counter() - start) * 1000
+        action = "✅ 已勾選" if checked else "❌ 已取消"
+        self.search_status.set(f"{action} {len(self.search_matches):,} 個符合的檔案（{elapsed:.0f} ms）")
+
+    def _matches_changed(self):
+        self._repaint_visible(self.root_iid)
+        self.results_list.redraw()
+        self._selection_changed()
+
+    def _get_selected_files(self):
+        """
+        依照勾選規則從索引收集被選中檔案的完整路徑，跳過完全未勾選的子樹。
+        在主執行緒走訪索引，只在背景掃描結束後呼叫；掃描取消時尚未讀取的資料夾在此讀取。
+        """
+        if self.index is None:
+            return []
+        return select_files(self.index, selection=self.selection)
+
+    def select_folder(self):
+        folder_selected = filedialog.askdirectory()
+        if folder_selected:
+            self.folder_path.set(folder_selected)
+            self.profile_name.set("")
+            self._populate_tree(folder_selected)
+            
+            # 更新進度顯示
+            self.progress_text.delete('1.0', tk.END)
+            self.progress_text.insert(tk.END, f"📁 已選擇專案資料夾: {folder_selected}\n\n", "success")
+            self.progress_text.insert(tk.END, "💡 提示：點擊檔案樹中的項目來選擇或取消選擇檔案\n", "info")
+            self.progress_text.insert(tk.END, "✅ = 已選擇  ❌ = 未選擇  ➖ = 部分選擇\n\n", "info")
+            self.progress_text.insert(tk.END, "準備好後，點擊「開始匯出」按鈕！🚀", "info_header")
+
+    def start_processing(self):
+        input_folder = self.folder_path.get()
+        if not input_folder:
+            messagebox.showwarning("⚠️ 警告", "請先選擇一個資料夾！")
+            return
+
+        if self.watcher is not None:
+            messagebox.showwarning("⚠️ 警告", "監看模式已在更新匯出檔案，請先停止監看！")
+            return
+        if self.progress_events is not None:
+            # 進度佇列在收到 end 事件後才清除；再次匯出會取代佇列，使前一次的進度與結果無法顯示
+            messagebox.showwarning("⚠️ 警告", "匯出進行中，請等待目前的匯出完成！")
+            return
+        if self.scan_queue is not None:
+            messagebox.showwarning("⚠️ 警告", "正在掃描資料夾，請等待掃描完成或取消掃描後再匯出！")
+            return
+
+        selected_files = self._get_selected_files()
+        if not selected_files:
+            messagebox.showwarning("⚠️ 警告", "您沒有選擇任何要匯出的檔案！")
+            return
+
+        limits = self._read_limits()
+        if limits is None:
+            return
+        max_file_kb, token_budget, tree_depth, tree_max_entries = limits
+        if token_budget and token_budget < MIN_TOKEN_BUDGET:
+            messagebox.showwarning("⚠️ 警告", f"Token 預算不可小於 {MIN_TOKEN_BUDGET}（0 表示不限制）！")
+            return
+
+        output_file = self._ask_output_file()
+        if not output_file:
+            return
+        outputs = self._output_paths(output_file)
+        try:
+            for path in outputs:
+                check_output(path)
+            if token_budget and any(output_format(path)[0] != "text" for path in outputs):
+                raise ValueError("Token 預算只適用於文字格式的輸出，請改用 .txt 或取消 JSONL 輸出！")
+        except ValueError as e:
+            messagebox.showwarning("⚠️ 警告", str(e))
+            return
+
+        events = self._reset_progress()
+
+        def success_callback(saved_file):
+            """成功完成後的回調函數；對話框由主迴圈在收到事件後顯示"""
+            events.put(("saved", saved_file))
+
+        export_options = {
+            "index": self.index,
+            "max_file_bytes": max_file_kb * 1024,
+            "token_budget": token_budget,
+            "budget_mode": dict(BUDGET_MODE_LABELS)[self.budget_mode.get()],
+            "tree_max_depth": tree_depth,
+            "tree_max_entries": tree_max_entries,
+            "dedupe": self.dedupe.get(),
+        }
+        thread = threading.Thread(
+            target=self._run_export,
+            args=(
+                input_folder, 
+                outputs,
+                selected_files,
+                self.include_tree.get(), 
+                QueueProgress(events),
+                success_callback,
+                self.use_cache.get(),
+                export_options
+            )
+        )
+        thread.start()
+        self._schedule_progress()
+
+    def _read_limits(self):
+        """讀取單檔大小、token 預算與目錄結構的限制，格式錯誤時回傳 None"""
+        limits = []
+        for variable, label in ((self.max_file_kb, "單檔大小上限"),
+                                (self.token_budget, "Token 預算"),
+                                (self.tree_depth, "目錄結構層數上限"),
+                                (self.tree_max_entries, "每個資料夾最多列出的項目數")):
+            value = self._read_non_negative_int(variable, label)
+            if value is None:
+                return None
+            limits.append(value)
+        return limits
+
+    def _ask_output_file(self):
+        """輸出格式與壓縮方式依副檔名決定（見 output_formats）"""
+        return filedialog.asksaveasfilename(
+            defaultextension=".txt",
+            filetypes=[("Text files", "*.txt"),
+                       ("JSON Lines", "*.jsonl"),
+                       ("Compressed text", "*.txt.gz *.txt.zst"),
+                       ("Compressed JSON Lines", "*.jsonl.gz *.jsonl.zst"),
+                       ("All files", "*.*")],
+            title="選擇儲存位置與檔名",
+            initialfile="project_summary.txt"
+        )
+
+    def _output_paths(self, output_file):
+        """主要輸出之外，勾選 JSONL 時加上同名、同壓縮方式的 .jsonl 檔案"""
+        fmt, compression = output_format(output_file)
+        if not self.also_jsonl.get() or fmt == "jsonl":
+            return [output_file]
+        base = output_file
+        suffix = ""
+        if compression is not None:
+            base, suffix = os.path.splitext(output_file)
+        return [output_file, os.path.splitext(base)[0] + ".jsonl" + suffix]
+
+    def _reset_progress(self):
+        """清空進度顯示並建立新的事件佇列"""
+        self.progress_text.delete('1.0', tk.END)
+        self.progress_bar.config(value=0, maximum=1)
+        self.progress_stats.set("")
+        self.meter = None
+        self.saved_file = None
+        events = queue.Queue()
+        self.progress_events = events
+        return events
+
+    def toggle_watch(self):
+        if self.watcher is not None:
+            self.stop_watch()
+        else:
+            self.start_watch()
+
+    def start_watch(self):
+        """
+        匯出一次後持續監看專案。監看執行緒使用自己的 FileIndex，
+        勾選狀態則以 SelectionRules 的副本傳入，勾選改變時替換副本並要求重新選取。
+        目錄結構改變時送出 ("tree", 資料夾集合) 事件，由主迴圈更新 Treeview。
+        """
+        input_folder = self.folder_path.get()
+        if not input_folder:
+            messagebox.showwarning("⚠️ 警告", "請先選擇一個資料夾！")
+            return
+        if self.progress_events is not None:
+            messagebox.showwarning("⚠️ 警告", "匯出進行中，請稍候再開始監看！")
+            return
+        if self.scan_queue is not None:
+            messagebox.showwarning("⚠️ 警告", "正在掃描資料夾，請等待掃描完成或取消掃描後再匯出！")
+            return
+        if not self._get_selected_files():
+            messagebox.showwarning("⚠️ 警告", "您沒有選擇任何要匯出的檔案！")
+            return
+
+        limits = self._read_limits()
+        if limits is None:
+            return
+        max_file_kb, _, tree_depth, tree_max_entries = limits
+
+        output_file = self._ask_output_file()
+        if not output_file:
+            return
+        if output_format(output_file) != ("text", None):
+            messagebox.showwarning("⚠️ 警告", "監看模式只支援未壓縮的文字格式輸出（.txt）！")
+            return
+
+        events = self._reset_progress()
+        patterns = [p.strip() for p in self.exclude_patterns.get().split(",") if p.strip()]
+        index = FileIndex(input_folder, self.use_gitignore.get(), patterns)
+        self.watch_selection = self.selection.copy()
+        self.watcher = ExportWatcher(
+            input_folder,
+            output_file,
+            index,
+            lambda: select_files(index, selection=self.watch_selection),
+            include_tree=self.include_tree.get(),
+            progress=QueueProgress(events),
+            max_file_bytes=max_file_kb * 1024,
+            tree_max_depth=tree_depth,
+            tree_max_entries=tree_max_entries,
+            on_update=lambda changed_dirs: events.put(("tree", changed_dirs)),
+        )
+        self.watch_btn.original_bg = "#DC3545"
+        self.watch_btn.config(text="⏹ 停止監看", bg="#DC3545")
+        thread = threading.Thread(target=self._run_watch, args=(self.watcher, events), daemon=True)
+        thread.start()
+        self._schedule_progress()
+
+    def stop_watch(self):
+        """停止監看；執行緒在目前的等待結束後送出 end 事件"""
+        if self.watcher is None:
+            return
+        self.watcher.stop()
+        self.watcher = None
+        self.watch_btn.original_bg = "#17A2B8"
+        self.watch_btn.config(text="👀 監看並自動更新", bg="#17A2B8")
+
+    def _run_watch(self, watcher, events):
+        progress = watcher.progress
+        try:
+            watcher.run()
+        except Exception as e:
+            progress.log(f"❌ 監看發生錯誤: {e}\n", "error")
+        finally:
+            progress.log("⏹ 已停止監看\n", "info_header")
+            events.put(("end",))
+
+    def _refresh_tree(self, changed_dirs):
+        """
+        監看偵測到目錄結構改變時，重新讀取已載入的對應資料夾並同步其子項目。
+        changed_dirs 為 None 時（忽略規則改變）同步所有已載入的資料夾。
+        背景掃描進行中時略過，避免與掃描執行緒同時修改索引。
+        """
+        if self.index is None or self.scan_queue is not None:
+            return
+        if changed_dirs is None:
+            self.index.invalidate()
+            targets = list(self.loaded_dirs)
+        else:
+            for rel_path in changed_dirs:
+                self.index.invalidate(rel_path)
+            targets = [iid for iid in self.loaded_dirs if self.item_paths.get(iid) in changed_dirs]
+        pending = {job[0] for job in self.insert_backlog}
+        # 由淺至深同步，上層移除的資料夾不再處理
+        targets.sort(key=lambda iid: self.item_paths[iid].count('/') if self.item_paths[iid] else -1)
+        for iid in targets:
+            if iid in self.item_paths and iid not in pending:
+                self._refresh_children(iid)
+        self._invalidate_search()
+
+    def _refresh_children(self, iid):
+        """依索引目前的內容插入新項目、刪除消失的項目並調整順序；保留既有項目的展開狀態"""
+        rel_path = self.item_paths[iid]
+        prefix = rel_path + '/' if rel_path else ''
+        dirs, files = self.index.children(rel_path)
+        existing = {self.item_paths[child]: child for child in self.child_items.get(iid, ())}
+        children = []
+        for position, entry in enumerate(dirs + files):
+            child = existing.pop(prefix + entry.name, None)
+            if child is None:
+                child = self._insert_item(iid, prefix + entry.name, entry, position)
+            else:
+                self.tree.move(child, iid, position)
+            children.append(child)
+        for child in existing.values():
+            self._forget_item(child)
+            self.tree.delete(child)
+        self.child_items[iid] = children
+        self._repaint_visible(iid)
+
+    def _forget_item(self, iid):
+        """移除項目及其所有子項目在 Python 端的狀態"""
+        stack = [iid]
+        while stack:
+            item = stack.pop()
+            stack.extend(self.child_items.pop(item, ()))
+            self.excluded_paths.discard(self.item_paths.pop(item, None))
+            self.item_labels.pop(item, None)
+            self.item_marks.pop(item, None)
+            self.item_parents.pop(item, None)
+            self.open_items.discard(item)
+            self.loaded_dirs.discard(item)
+
+    def _schedule_progress(self):
+        if self.progress_job is None:
+            self.progress_job = self.root.after(PROGRESS_FRAME_MS, self._drain_progress)
+
+    def _drain_progress(self):
+        """
+        在主迴圈中取出匯出執行緒累積的所有事件，每個畫面只更新一次介面：
+        相同類型的連續訊息合併為一次插入，記錄區超過 PROGRESS_LOG_LINES 行時刪除最舊的行。
+        """
+        self.progress_job = None
+        events = self.progress_events
+        if events is None:
+            return
+
+        messages = deque(maxlen=PROGRESS_LOG_LINES)
+        finished = False
+        while True:
+            try:
+                event = events.get_nowait()
+            except queue.Empty:
+                break
+            kind = event[0]
+            if kind == "log":
+                messages.append(event[1:])
+            elif kind == "file":
+                if self.meter is not None:
+                    self.meter.add(1, event[1])
+            elif kind == "begin":
+                self.meter = ThroughputMeter(event[1], event[2])
+                self.progress_bar.config(maximum=max(event[1], 1))
+            elif kind == "tree":
+                self._refresh_tree(event[1])
+            elif kind == "saved":
+                self.saved_file = event[1]
+            elif kind == "end":
+                finished = True
+
+        self._append_log(messages)
+        if self.meter is not None:
+            self.progress_bar.config(value=self.meter.files)
+            self.progress_stats.set(self.meter.describe())
+
+        if finished:
+            self.progress_events = None
+            # 監看執行緒因錯誤結束時恢復按鈕狀態
+            self.stop_watch()
+            saved_file, self.saved_file = self.saved_file, None
+            if saved_file is not None:
+                messagebox.showinfo("✅ 成功", f"專案內容已成功匯出至\n{saved_file}")
+        else:
+            self._schedule_progress()
+
+    def _append_log(self, messages):
+        """將合併後的訊息寫入記錄區，只保留最後 PROGRESS_LOG_LINES 行"""
+        if not messages:
+            return
+        run_tag = None
+        run = []
+        for message, tag in messages:
+            if tag != run_tag and run:
+                self.progress_text.insert(tk.END, "".join(run), run_tag)
+                run = []
+            run_tag = tag
+            run.append(message)
+        self.progress_text.insert(tk.END, "".join(run), run_tag)
+
+        lines = int(self.progress_text.index("end-1c").split(".")[0])
+        if lines > PROGRESS_LOG_LINES:
+            self.progress_text.delete("1.0", f"{lines - PROGRESS_LOG_LINES + 1}.0")
+        self.progress_text.see(tk.END)
+
+    def _read_non_negative_int(self, variable, label):
+        """讀取輸入框中的非負整數，格式錯誤時顯示警告並回傳 None"""
+        try:
+            value = int(variable.get().strip() or 0)
+            if value < 0:
+                raise ValueError
+        except ValueError:
+            messagebox.showwarning("⚠️ 警告", f"{label}必須是大於或等於 0 的整數！")
+            return None
+        return value
+
+    def _run_export(self, input_folder, output_files, selected_files, include_tree, progress, success_callback, use_cache, export_options):
+        """在背景執行緒中執行匯出；快取在同一執行緒中開啟與關閉"""
+        cache = None
+        if use_cache:
+            try:
+                cache = SectionCache()
+            except Exception as e:
+                progress.log(f"⚠️ 無法開啟快取，將完整重新讀取: {e}\n", "error")
+
+        try:
+            create_project_summary(input_folder, output_files, selected_files, include_tree, progress,
+                                   success_callback, cache=cache, **export_options)
+        finally:
+            if cache is not None:
+                cache.close()
+            progress.events.put(("end",))
+
+
+def run():
+    """啟動圖形介面"""
+    root = tk.Tk()
+    app = App(root)
+    root.mainloop()
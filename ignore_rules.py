@@ -0,0 +1,182 @@
+"""
+.gitignore / .ignore 樣式比對。
+
+每個忽略檔只編譯一次成 IgnoreMatcher：最常見的樣式（純名稱如 node_modules、
+副檔名如 *.log）放進雜湊表，以檔名直接查詢；其餘樣式依比對名稱或完整路徑
+合併成少數幾個正規表示式，每個路徑各只比對一次。因此一般專案的忽略規則數量增加時，每個路徑的比對成本
+幾乎不變。語意遵循 git：後面的規則優先、! 反向、結尾 / 只比對資料夾、
+含 / 的樣式相對於忽略檔所在的資料夾。
+"""
+import re
+
+IGNORE_FILES = (".gitignore", ".ignore")
+
+_GLOB_CHARS = re.compile(r"[*?\[\\]")
+_SUFFIX_PATTERN = re.compile(r"^\*(\.[^*?\[\\/]+)$")
+
+
+def _translate(pattern):
+    """將 gitignore 的 glob 轉為正規表示式（不含錨點）"""
+    out = []
+    i, n = 0, len(pattern)
+    while i < n:
+        c = pattern[i]
+        if c == "*":
+            if pattern.startswith("**", i):
+                if i + 2 < n and pattern[i + 2] == "/":
+                    out.append("(?:.*/)?")
+                    i += 3
+                else:
+                    out.append(".*")
+                    i += 2
+                continue
+            out.append("[^/]*")
+        elif c == "?":
+            out.append("[^/]")
+        elif c == "[":
+            j = i + 1
+            if j < n and pattern[j] in "!^":
+                j += 1
+            if j < n and pattern[j] == "]":
+                j += 1
+            while j < n and pattern[j] != "]":
+                j += 1
+            if j >= n:
+                out.append("\\[")
+            else:
+                stuff = pattern[i + 1:j].replace("\\", "\\\\")
+                if stuff[0] in "!^":
+                    stuff = "^" + stuff[1:]
+                out.append(f"[{stuff}]")
+                i = j
+        elif c == "\\" and i + 1 < n:
+            i += 1
+            out.append(re.escape(pattern[i]))
+        else:
+            out.append(re.escape(c))
+        i += 1
+    return "".join(out)
+
+
+def parse_pattern(line):
+    """
+    解析一行忽略樣式，回傳 (樣式, 是否反向, 是否只比對資料夾, 是否錨定)；
+    空行與註解回傳 None。
+    """
+    line = line.rstrip("\r\n")
+    stripped = line.rstrip(" ")
+    if stripped.endswith("\\") and len(stripped) < len(line):
+        stripped += " "
+    line = stripped
+    if not line or line.startswith("#"):
+        return None
+
+    negate = line.startswith("!")
+    if negate:
+        line = line[1:]
+    elif line.startswith(("\\!", "\\#")):
+        line = line[1:]
+
+    dir_only = line.endswith("/")
+    line = line.rstrip("/")
+    if not line:
+        return None
+
+    if line.startswith("**/"):
+        line = line[3:]
+        anchored = False
+    else:
+        anchored = "/" in line
+        line = line.lstrip("/")
+    return line, negate, dir_only, anchored
+
+
+class IgnoreMatcher:
+    """一組已編譯的忽略樣式（通常來自同一個資料夾的忽略檔）"""
+    def __init__(self, lines):
+        self.names = {}
+        self.dir_names = {}
+        self.suffixes = {}
+        self.dir_suffixes = {}
+        # (是否只比對資料夾, 是否只比對名稱) -> [(規則, 正規表示式)]
+        regex_rules = {}
+
+        index = 0
+        for line in lines:
+            parsed = parse_pattern(line)
+            if parsed is None:
+                continue
+            pattern, negate, dir_only, anchored = parsed
+            rule = (index, not negate)
+            index += 1
+
+            # 不含 / 的樣式可在任何層級符合，只需比對名稱
+            name_only = not anchored and "/" not in pattern
+            if name_only and not _GLOB_CHARS.search(pattern):
+                (self.dir_names if dir_only else self.names)[pattern] = rule
+                continue
+            suffix = _SUFFIX_PATTERN.match(pattern) if name_only else None
+            if suffix:
+                (self.dir_suffixes if dir_only else self.suffixes)[suffix.group(1)] = rule
+                continue
+
+            body = _translate(pattern)
+            if not anchored and not name_only:
+                body = "(?:.*/)?" + body
+            regex_rules.setdefault((dir_only, name_only), []).append((rule, body))
+
+        self.regexes = [(dir_only, name_only) + self._compile(rules)
+                        for (dir_only, name_only), rules in sorted(regex_rules.items())]
+        self.empty = index == 0
+
+    @staticmethod
+    def _compile(rules):
+        """
+        將多個樣式合併成單一正規表示式。替代項依規則順序由後往前排列，
+        第一個成功的替代項即為最後一條符合的規則。
+        """
+        rules = sorted(rules, key=lambda item: -item[0][0])
+        parts = [f"(?P<r{rule[0]}>{body})" for rule, body in rules]
+        return re.compile("|".join(parts)), {f"r{rule[0]}": rule for rule, _ in rules}
+
+    def match(self, rel_path, name, is_dir):
+        """
+        比對相對於忽略檔所在資料夾的路徑。
+        回傳 True（忽略）、False（被 ! 規則重新納入）或 None（沒有規則符合）。
+        """
+        best = None
+
+        def consider(rule):
+            nonlocal best
+            if rule is not None and (best is None or rule[0] > best[0]):
+                best = rule
+
+        consider(self.names.get(name))
+        if is_dir:
+            consider(self.dir_names.get(name))
+        if self.suffixes or (is_dir and self.dir_suffixes):
+            dot = name.find(".", 1)
+            while dot != -1:
+                suffix = name[dot:]
+                consider(self.suffixes.get(suffix))
+                if is_dir:
+                    consider(self.dir_suffixes.get(suffix))
+                dot = name.find(".", dot + 1)
+
+        for dir_only, name_only, regex, rules in self.regexes:
+            if dir_only and not is_dir:
+                continue
+            m = regex.fullmatch(name if name_only else rel_path)
+            if m is not None:
+                consider(rules[m.lastgroup])
+
+        return None if best is None else best[1]
+
+
+def load_ignore_file(path):
+    """讀取忽略檔的所有行；無法讀取時回傳空列表"""
+    try:
+        with open(path, "r", encoding="utf-8", errors="ignore") as f:
+            return f.read().splitlines()
+    except OSError:
+        return []
@@ -0,0 +1,150 @@
+"""
+匯出的輸出格式與壓縮方式。
+
+輸出檔案的格式由副檔名決定：.jsonl（或 .ndjson）為 JSONL，每行一個檔案記錄
+（path、size、tokens、truncated、content）；其餘為原本以程式碼框區隔的文字格式。
+最後再加上 .gz 或 .zst 時以 gzip 或 zstd 串流壓縮，例如 summary.txt.gz、
+summary.jsonl.zst。zstd 需要另外安裝 zstandard 套件，未安裝時只有 .zst 輸出無法使用。
+
+同一次匯出可以指定多個輸出檔案：每個檔案只讀取、轉換一次，再分送給所有輸出，
+增加輸出格式不會增加讀取量。
+"""
+import codecs
+import gzip
+import json
+import os
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+COMPRESSION_SUFFIXES = {".gz": "gzip", ".zst": "zstd"}
+JSONL_SUFFIXES = (".jsonl", ".ndjson")
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 3
+
+
+def output_format(path):
+    """依副檔名回傳 (格式, 壓縮方式)：格式為 text 或 jsonl，壓縮方式為 None、gzip 或 zstd"""
+    base, ext = os.path.splitext(path)
+    compression = COMPRESSION_SUFFIXES.get(ext.lower())
+    if compression is None:
+        base = path
+    fmt = "jsonl" if os.path.splitext(base)[1].lower() in JSONL_SUFFIXES else "text"
+    return fmt, compression
+
+
+def check_output(path):
+    """輸出檔案的格式無法使用時引發 ValueError"""
+    if output_format(path)[1] == "zstd" and zstandard is None:
+        raise ValueError(f"輸出 {os.path.basename(path)} 需要安裝 zstandard 套件（pip install zstandard）")
+
+
+def part_path(path, number):
+    """分割輸出時第 number 個檔案的路徑；壓縮副檔名保留在最後，例如 name.part1.txt.gz"""
+    base, ext = os.path.splitext(path)
+    suffix = ""
+    if ext.lower() in COMPRESSION_SUFFIXES:
+        suffix = ext
+        base, ext = os.path.splitext(base)
+    return f"{base}.part{number}{ext}{suffix}"
+
+
+class _CompressedFile:
+    """壓縮串流；關閉時先寫完壓縮資料再關閉底層檔案"""
+    def __init__(self, raw, stream):
+        self.raw = raw
+        self.stream = stream
+
+    def write(self, data):
+        return self.stream.write(data)
+
+    def close(self):
+        try:
+            self.stream.close()
+        finally:
+            self.raw.close()
+
+
+class _TeeFile:
+    """將寫入的位元組複製到多個檔案（沒有檔案時直接丟棄）"""
+    def __init__(self, files):
+        self.files = files
+
+    def write(self, data):
+        for f in self.files:
+            f.write(data)
+        return len(data)
+
+    def close(self):
+        error = None
+        for f in self.files:
+            try:
+                f.close()
+            except Exception as e:
+                error = error or e
+        if error is not None:
+            raise error
+
+
+def open_output_file(path, buffer_size=-1):
+    """依副檔名開啟可寫入位元組的輸出檔案，需要時包上壓縮串流"""
+    check_output(path)
+    compression = output_format(path)[1]
+    raw = open(path, 'wb', buffering=buffer_size)
+    try:
+        if compression == "gzip":
+            # mtime=0 讓內容相同的匯出產生相同的壓縮檔
+            return _CompressedFile(raw, gzip.GzipFile(fileobj=raw, mode='wb', compresslevel=GZIP_LEVEL, mtime=0))
+        if compression == "zstd":
+            return _CompressedFile(raw, zstandard.ZstdCompressor(level=ZSTD_LEVEL).stream_writer(raw))
+    except Exception:
+        raw.close()
+        raise
+    return raw
+
+
+def open_output_files(paths, buffer_size=-1):
+    """開啟多個輸出檔案；只有一個時直接回傳該檔案（保留 tell() 等方法）"""
+    files = []
+    try:
+        for path in paths:
+            files.append(open_output_file(path, buffer_size))
+    except Exception:
+        _TeeFile(files).close()
+        raise
+    return files[0] if len(files) == 1 else _TeeFile(files)
+
+
+class JsonlWriter:
+    """
+    JSONL 輸出：每個檔案一行記錄。content 依區塊串流編碼為 JSON 字串，
+    大型檔案不需要在記憶體中組成完整字串。
+    """
+    def __init__(self, path, buffer_size=-1):
+        self.path = path
+        self.outfile = open_output_file(path, buffer_size)
+
+    def write_record(self, relative_path, size, tokens, truncated, chunks, duplicate_of=None):
+        """
+        寫入一筆記錄；chunks 為檔案內容（UTF-8 位元組區塊）的迭代器。
+        重複的檔案另外記錄 duplicate_of（內容相同的檔案路徑），content 為空字串。
+        """
+        record = {"path": relative_path, "size": size, "tokens": tokens, "truncated": truncated}
+        if duplicate_of is not None:
+            record["duplicate_of"] = duplicate_of
+        fields = json.dumps(record, ensure_ascii=False)
+        self.outfile.write(fields[:-1].encode('utf-8') + b', "content": "')
+        decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        for chunk in chunks:
+            self._write_string(decoder.decode(chunk))
+        self._write_string(decoder.decode(b'', final=True))
+        self.outfile.write(b'"}\n')
+
+    def _write_string(self, text):
+        if text:
+            self.outfile.write(json.dumps(text, ensure_ascii=False)[1:-1].encode('utf-8'))
+
+    def close(self):
+        self.outfile.close()
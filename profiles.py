@@ -0,0 +1,89 @@
+"""
+具名的選取設定檔。
+
+勾選狀態本來就是以路徑前綴規則記錄（見 exporter.SelectionRules），設定檔直接保存
+這些規則：include 為勾選的路徑、exclude 為取消勾選的路徑，根目錄以 "" 表示。
+設定檔存放在專案根目錄的隱藏檔案 PROFILES_FILE 中（掃描時會略過隱藏檔案，
+不會被匯出），可以一併提交到版本控制，讓命令列與 GUI 共用同一組選取。
+"""
+import json
+import os
+
+from exporter import SelectionRules
+
+PROFILES_FILE = ".context_export_profiles.json"
+PROFILES_VERSION = 1
+
+
+def profiles_path(root_path):
+    return os.path.join(root_path, PROFILES_FILE)
+
+
+def _normalize(rel_path):
+    return rel_path.replace('\\', '/').strip('/')
+
+
+def load_profiles(root_path):
+    """
+    讀取專案的所有設定檔，回傳 {名稱: {路徑: 是否勾選}}。
+    檔案不存在時回傳空字典；格式錯誤時引發 ValueError。
+    """
+    try:
+        with open(profiles_path(root_path), 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        raise ValueError(f"無法讀取選取設定檔 {PROFILES_FILE}: {e}")
+
+    profiles = {}
+    entries = data.get("profiles") if isinstance(data, dict) else None
+    if not isinstance(entries, dict):
+        raise ValueError(f"選取設定檔 {PROFILES_FILE} 格式錯誤")
+    for name, entry in entries.items():
+        rules = {}
+        for key, state in (("include", True), ("exclude", False)):
+            paths = entry.get(key, []) if isinstance(entry, dict) else None
+            if not isinstance(paths, list) or not all(isinstance(p, str) for p in paths):
+                raise ValueError(f"選取設定檔 {PROFILES_FILE} 中的「{name}」格式錯誤")
+            for rel_path in paths:
+                rules[_normalize(rel_path)] = state
+        profiles[name] = rules
+    return profiles
+
+
+def load_selection(root_path, name):
+    """取得設定檔對應的 SelectionRules；找不到時引發 KeyError"""
+    selection = SelectionRules()
+    selection.load(load_profiles(root_path)[name])
+    return selection
+
+
+def _write_profiles(root_path, profiles):
+    """依名稱與路徑排序寫入（方便在版本控制中比較差異），以暫存檔原子性地取代"""
+    data = {"version": PROFILES_VERSION, "profiles": {}}
+    for name in sorted(profiles):
+        rules = profiles[name]
+        data["profiles"][name] = {
+            "include": sorted(p for p, state in rules.items() if state),
+            "exclude": sorted(p for p, state in rules.items() if not state),
+        }
+    path = profiles_path(root_path)
+    temp_path = path + ".tmp"
+    with open(temp_path, 'w', encoding='utf-8', newline='\n') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+        f.write('\n')
+    os.replace(temp_path, path)
+
+
+def save_profile(root_path, name, selection):
+    """將 SelectionRules 儲存為具名設定檔（同名時覆蓋）"""
+    profiles = load_profiles(root_path)
+    profiles[name] = dict(selection.rules)
+    _write_profiles(root_path, profiles)
+
+
+def delete_profile(root_path, name):
+    profiles = load_profiles(root_path)
+    if profiles.pop(name, None) is not None:
+        _write_profiles(root_path, profiles)
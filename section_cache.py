@@ -0,0 +1,190 @@
+"""
+匯出區段的持久快取。
+
+以 SQLite 保存每個檔案轉換後的完整區段（包含 (路徑的內容) 標題與程式碼框），
+鍵為檔案路徑與區段參數，並以大小、修改時間及可選的內容雜湊判斷是否仍然有效。
+重複匯出時未變更的檔案直接從快取拼接，不需要重新讀取；總大小超過上限時
+依最近使用時間 (LRU) 淘汰。
+"""
+import hashlib
+import os
+import sqlite3
+import time
+
+DEFAULT_CACHE_MAX_BYTES = 512 * 1024 * 1024
+HASH_CHUNK_SIZE = 1024 * 1024
+# 單一區段的快取上限：區段寫入與讀出時都整段放在記憶體中，更大的檔案照常串流匯出，不經過快取
+MAX_SECTION_BYTES = 16 * 1024 * 1024
+
+
+def default_cache_path():
+    """依作業系統慣例回傳快取資料庫位置"""
+    base = os.environ.get("XDG_CACHE_HOME") or os.environ.get("LOCALAPPDATA")
+    if not base:
+        base = os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "context_export", "sections.sqlite3")
+
+
+def _hash_file(file_path):
+    """計算檔案內容的 BLAKE2b 雜湊"""
+    digest = hashlib.blake2b(digest_size=20)
+    with open(file_path, 'rb') as f:
+        while True:
+            chunk = f.read(HASH_CHUNK_SIZE)
+            if not chunk:
+                break
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class SectionCache:
+    """
+    已轉換檔案區段的磁碟快取。
+
+    使用流程：對每個檔案呼叫 check() 判斷是否命中；命中時以 load() 取得區段，
+    未命中時在轉換後以 store() 寫入；匯出結束時呼叫 finish() 提交並淘汰舊資料。
+    超過 MAX_SECTION_BYTES 的檔案不查詢也不寫入，另外計為未快取。
+    verify_hash 為 True 時，修改時間改變但大小相同的檔案會以內容雜湊再次確認，
+    適合 git checkout 等只更新修改時間的情況。
+    """
+    def __init__(self, path=None, max_bytes=DEFAULT_CACHE_MAX_BYTES, verify_hash=False):
+        self.path = path or default_cache_path()
+        self.max_bytes = max_bytes
+        self.verify_hash = verify_hash
+        self.hits = 0
+        self.misses = 0
+        self.uncached = 0
+        self.stored = 0
+        self.evicted = 0
+        self.bytes_served = 0
+        self._pending = {}
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        # 新資料庫啟用自動回收，淘汰後檔案大小隨之縮小
+        self.conn.execute("PRAGMA auto_vacuum = FULL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS sections ("
+            " id INTEGER PRIMARY KEY,"
+            " path TEXT NOT NULL,"
+            " key TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " mtime_ns INTEGER NOT NULL,"
+            " hash TEXT,"
+            " section BLOB NOT NULL,"
+            " nbytes INTEGER NOT NULL,"
+            " last_used REAL NOT NULL,"
+            " UNIQUE (path, key))")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS sections_lru ON sections (last_used)")
+        self.conn.commit()
+
+    def check(self, file_path, key, size=None):
+        """
+        判斷快取是否仍有效；命中時回傳資料列 id，否則回傳 None。
+        size 為預計寫入區段的內容大小，超過 MAX_SECTION_BYTES 時不查詢，計為未快取。
+        """
+        if size is not None and size > MAX_SECTION_BYTES:
+            self.uncached += 1
+            return None
+        try:
+            st = os.stat(file_path)
+        except OSError:
+            self.misses += 1
+            return None
+
+        row = self.conn.execute(
+            "SELECT id, size, mtime_ns, hash FROM sections WHERE path = ? AND key = ?",
+            (file_path, key)).fetchone()
+        if row is not None:
+            row_id, size, mtime_ns, content_hash = row
+            if size == st.st_size and mtime_ns == st.st_mtime_ns:
+                return self._hit(row_id)
+            if self.verify_hash and content_hash and size == st.st_size:
+                try:
+                    same = _hash_file(file_path) == content_hash
+                except OSError:
+                    same = False
+                if same:
+                    self.conn.execute("UPDATE sections SET mtime_ns = ? WHERE id = ?",
+                                      (st.st_mtime_ns, row_id))
+                    return self._hit(row_id)
+
+        self.misses += 1
+        self._pending[(file_path, key)] = (st.st_size, st.st_mtime_ns)
+        return None
+
+    def _hit(self, row_id):
+        self.hits += 1
+        self.conn.execute("UPDATE sections SET last_used = ? WHERE id = ?", (time.time(), row_id))
+        return row_id
+
+    def load(self, row_id):
+        """取得命中的區段位元組"""
+        section = self.conn.execute("SELECT section FROM sections WHERE id = ?", (row_id,)).fetchone()[0]
+        self.bytes_served += len(section)
+        return section
+
+    def wants(self, file_path, key):
+        """check() 未命中、轉換後應以 store() 寫入時回傳 True"""
+        return (file_path, key) in self._pending
+
+    def store(self, file_path, key, section):
+        """寫入 check() 未命中的檔案區段；使用 check() 時記錄的大小與修改時間"""
+        stat = self._pending.pop((file_path, key), None)
+        if stat is None or len(section) > MAX_SECTION_BYTES:
+            return
+        size, mtime_ns = stat
+        content_hash = None
+        if self.verify_hash:
+            try:
+                content_hash = _hash_file(file_path)
+            except OSError:
+                return
+        self.conn.execute(
+            "INSERT OR REPLACE INTO sections (path, key, size, mtime_ns, hash, section, nbytes, last_used)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (file_path, key, size, mtime_ns, content_hash, sqlite3.Binary(section), len(section), time.time()))
+        self.stored += 1
+
+    def finish(self):
+        """提交變更，並依最近使用時間淘汰超過大小上限的資料"""
+        self._pending.clear()
+        total = self.conn.execute("SELECT COALESCE(SUM(nbytes), 0) FROM sections").fetchone()[0]
+        if total > self.max_bytes:
+            doomed = []
+            for row_id, nbytes in self.conn.execute("SELECT id, nbytes FROM sections ORDER BY last_used"):
+                if total <= self.max_bytes:
+                    break
+                doomed.append((row_id,))
+                total -= nbytes
+            self.conn.executemany("DELETE FROM sections WHERE id = ?", doomed)
+            self.evicted += len(doomed)
+        self.conn.commit()
+
+    def stats(self):
+        """回傳本次使用的統計資料"""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "uncached": self.uncached,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "stored": self.stored,
+            "evicted": self.evicted,
+            "bytes_served": self.bytes_served,
+        }
+
+    def report(self):
+        """以一行文字描述統計資料"""
+        s = self.stats()
+        uncached = ""
+        if s['uncached']:
+            uncached = f"，{s['uncached']:,} 個大於 {MAX_SECTION_BYTES // (1024 * 1024)} MB 的檔案未快取"
+        return (f"💾 快取命中 {s['hits']:,} / 未命中 {s['misses']:,}"
+                f"（命中率 {s['hit_rate']:.1%}）{uncached}，新增 {s['stored']:,}，淘汰 {s['evicted']:,}，"
+                f"重用 {s['bytes_served'] / 1e6:.1f} MB")
+
+    def close(self):
+        self.conn.close()
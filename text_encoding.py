@@ -0,0 +1,218 @@
+"""
+原始碼的編碼判斷與 UTF-8 輸出。
+
+先檢查 BOM；沒有 BOM 時取樣檔案開頭（較大的檔案另外取樣中段與結尾）：
+樣本能以 UTF-8 嚴格解碼就視為 UTF-8。不能時，若合法的 UTF-8 多位元組字元多於錯誤位元組，仍視為夾雜少數錯誤位元組的 UTF-8；
+否則以 Big5（cp950）與 GBK（gb18030）中能完整解碼樣本者，依解碼結果中常用字與
+其他非 ASCII 字元的比例評分，取分數最高者。繁體與簡體的常用字在兩種編碼中的位元組
+範圍不同，以錯誤的編碼解碼時多半得到罕用字，分數為負；沒有任何編碼得到正分時維持
+UTF-8（無法解碼的位元組以 U+FFFD 標示），避免把 Latin-1 等其他編碼誤判為中文。
+
+UTF-8 檔案不經過解碼與重新編碼：純 ASCII 的區塊直接寫入，其餘區塊只驗證一次後
+寫入原始位元組，只有驗證失敗的區塊才以替代字元修正。其他編碼才逐區塊轉碼。
+兩種路徑都將換行統一為 '\n'。
+"""
+import codecs
+import io
+import re
+
+# 取樣大小：小於 SAMPLE_BYTES * 3 的檔案整檔判斷，否則取開頭、中段與結尾各一段
+SAMPLE_BYTES = 16 * 1024
+# 寫入時每個區塊的大小上限；UTF-8 區塊盡量在換行處切開
+COPY_CHUNK_SIZE = 256 * 1024
+
+BOM_ENCODINGS = (
+    (codecs.BOM_UTF8, "utf-8"),
+    (codecs.BOM_UTF16_LE, "utf-16-le"),
+    (codecs.BOM_UTF16_BE, "utf-16-be"),
+)
+LEGACY_ENCODINGS = ("cp950", "gb18030")
+
+# 各編碼的常用字範圍 (首位元組, 尾位元組)：Big5 的符號區與常用字（A440–C67E），
+# GB2312 的符號區與一級漢字（B0A1–D7F9）。以正確編碼解碼時絕大多數字元落在常用字內，
+# 以錯誤編碼解碼時會出現大量罕用字、注音與全形符號以外的字元
+COMMON_RANGES = {
+    "cp950": [(range(0xA1, 0xA4), range(0x40, 0xFF)), (range(0xA4, 0xC6), range(0x40, 0xFF)),
+              (range(0xC6, 0xC7), range(0x40, 0x7F))],
+    "gb18030": [(range(0xA1, 0xA4), range(0xA1, 0xFF)), (range(0xB0, 0xD8), range(0xA1, 0xFF))],
+}
+_NON_ASCII = re.compile(r"[^\x00-\x7f]+")
+
+_common_chars = {}
+
+
+def _common(encoding):
+    """依 COMMON_RANGES 建立常用字集合（第一次使用時建立）"""
+    chars = _common_chars.get(encoding)
+    if chars is None:
+        chars = set()
+        for leads, trails in COMMON_RANGES[encoding]:
+            for lead in leads:
+                for trail in trails:
+                    try:
+                        chars.add(bytes((lead, trail)).decode(encoding))
+                    except UnicodeDecodeError:
+                        pass
+        chars = frozenset(chars)
+        _common_chars[encoding] = chars
+    return chars
+
+
+def _sample(data, start, end):
+    """取出 data[start:end]，不在檔案開頭時從下一行開始，不在結尾時到前一行結束"""
+    sample = data[start:end]
+    if start > 0:
+        newline = sample.find(b"\n")
+        sample = sample[newline + 1:] if newline >= 0 else sample
+    if end < len(data):
+        newline = sample.rfind(b"\n")
+        sample = sample[:newline + 1] if newline >= 0 else sample
+    return sample
+
+
+def _samples(data, offset):
+    size = len(data)
+    if size - offset <= SAMPLE_BYTES * 3:
+        return [data[offset:]]
+    middle = (offset + size - SAMPLE_BYTES) // 2
+    return [_sample(data, offset, offset + SAMPLE_BYTES),
+            _sample(data, middle, middle + SAMPLE_BYTES),
+            _sample(data, size - SAMPLE_BYTES, size)]
+
+
+def _is_utf8(sample):
+    if sample.isascii():
+        return True
+    # 樣本邊界沒有換行時可能切在多位元組字元中間：略過開頭的延續位元組，結尾不完整的字元不算錯誤
+    start = 0
+    while start < 3 and start < len(sample) and (sample[start] & 0xC0) == 0x80:
+        start += 1
+    try:
+        codecs.utf_8_decode(sample[start:], "strict", False)
+    except UnicodeDecodeError:
+        return False
+    return True
+
+
+def _non_ascii(samples, encoding):
+    """以 encoding 解碼樣本，回傳其中的非 ASCII 字元（無法解碼的位元組為 U+FFFD）"""
+    parts = []
+    for sample in samples:
+        text = codecs.getincrementaldecoder(encoding)(errors="replace").decode(sample)
+        parts.extend(_NON_ASCII.findall(text))
+    return "".join(parts)
+
+
+def _score(non_ascii, encoding):
+    """常用字加分、其他非 ASCII 字元扣分"""
+    hits = sum(map(_common(encoding).__contains__, non_ascii))
+    return 2 * hits - len(non_ascii)
+
+
+def detect_encoding(data):
+    """
+    判斷 data（bytes 或 mmap）的編碼，回傳 (編碼, BOM 長度)。
+    編碼為 utf-8、utf-16-le、utf-16-be、cp950 或 gb18030。
+    """
+    for bom, encoding in BOM_ENCODINGS:
+        if data[:len(bom)] == bom:
+            return encoding, len(bom)
+    samples = _samples(data, 0)
+    if all(_is_utf8(sample) for sample in samples):
+        return "utf-8", 0
+
+    # 以其他編碼寫成的文字幾乎不會湊出合法的 UTF-8 多位元組字元；
+    # 合法字元多於錯誤位元組時視為夾雜少數錯誤位元組的 UTF-8
+    text = _non_ascii(samples, "utf-8")
+    invalid = text.count("\ufffd")
+    if len(text) - invalid > invalid:
+        return "utf-8", 0
+
+    best, best_score = "utf-8", 0
+    for encoding in LEGACY_ENCODINGS:
+        text = _non_ascii(samples, encoding)
+        if "\ufffd" in text:
+            continue
+        score = _score(text, encoding)
+        if score > best_score:
+            best, best_score = encoding, score
+    return best, 0
+
+
+def align_start(data, position, encoding, bom=0):
+    """
+    將截斷後保留的結尾部分的起點調整到字元邊界：UTF-8 略過延續位元組、UTF-16 對齊兩個位元組；
+    Big5/GBK 無法從單一位元組判斷是否為字元開頭，改從下一行開始（換行不會是雙位元組字元的一部分）。
+    """
+    if encoding == "utf-8":
+        while position < len(data) and (data[position] & 0xC0) == 0x80:
+            position += 1
+    elif encoding.startswith("utf-16"):
+        position += (position - bom) % 2
+    else:
+        newline = data.find(b"\n", position, position + SAMPLE_BYTES)
+        if newline >= 0:
+            position = newline + 1
+    return position
+
+
+def align_end(data, position, encoding, bom=0):
+    """將截斷後保留的開頭部分的終點調整到字元邊界（Big5/GBK 由解碼器保留不完整的字元，不需調整）"""
+    if encoding == "utf-8":
+        while position > 0 and position < len(data) and (data[position] & 0xC0) == 0x80:
+            position -= 1
+    elif encoding.startswith("utf-16"):
+        position -= (position - bom) % 2
+    return position
+
+
+def _normalize_newlines(chunk):
+    if b"\r" in chunk:
+        # split/join 比 replace(b"\r\n", ...) 快；剩下的單獨 \r 通常不存在，檢查只需一次 memchr
+        chunk = b"\n".join(chunk.split(b"\r\n"))
+        if b"\r" in chunk:
+            chunk = chunk.replace(b"\r", b"\n")
+    return chunk
+
+
+def _copy_utf8(data, outfile, start, end):
+    """直接寫入 UTF-8 位元組；區塊在換行處切開，不會切斷字元或 \\r\\n"""
+    while start < end:
+        stop = min(end, start + COPY_CHUNK_SIZE)
+        if stop < end:
+            newline = data.rfind(b"\n", start, stop)
+            if newline >= 0:
+                stop = newline + 1
+            else:
+                stop = max(start + 1, align_end(data, stop, "utf-8"))
+                if data[stop - 1] == 0x0D and stop - 1 > start:
+                    stop -= 1
+        chunk = data[start:stop]
+        start = stop
+        if not chunk.isascii():
+            try:
+                chunk.decode("utf-8")
+            except UnicodeDecodeError:
+                chunk = chunk.decode("utf-8", "replace").encode("utf-8")
+        outfile.write(_normalize_newlines(chunk))
+
+
+def _copy_transcoded(data, outfile, start, end, encoding, final):
+    decoder = io.IncrementalNewlineDecoder(codecs.getincrementaldecoder(encoding)(errors="replace"), translate=True)
+    while start < end:
+        stop = min(end, start + COPY_CHUNK_SIZE)
+        outfile.write(decoder.decode(data[start:stop]).encode("utf-8"))
+        start = stop
+    # 截斷的開頭部分不輸出最後不完整的字元
+    outfile.write(decoder.decode(b"", final=final).encode("utf-8"))
+
+
+def copy_as_utf8(data, outfile, encoding, start, end, final=True):
+    """
+    將 data[start:end] 以 UTF-8 寫入 outfile，換行統一為 '\\n'。
+    final 為 False 表示 end 不是檔案結尾（截斷），結尾不完整的字元直接捨棄。
+    """
+    if encoding == "utf-8":
+        _copy_utf8(data, outfile, start, end)
+    else:
+        _copy_transcoded(data, outfile, start, end, encoding, final)
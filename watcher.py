@@ -0,0 +1,437 @@
+"""
+監看模式：專案檔案變更時自動更新匯出檔案。
+
+Linux 上透過 ctypes 使用 inotify，其他平台或 inotify 無法使用時（例如網路磁碟）
+改為定期比對資料夾與檔案的修改時間。連續的變更先經過去抖動 (debounce) 合併，
+接著只重新掃描有變動的資料夾、只重新轉換有變更的檔案；未變更的區段直接從上一版
+輸出檔案依位元組範圍複製，最後以 os.replace 原子性地取代輸出檔案。
+"""
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+import sys
+import threading
+import time
+
+from exporter import (DEFAULT_READ_WORKERS, DEFAULT_TREE_MAX_ENTRIES, EXPORT_CHUNK_SIZE, ExportOutput,
+                      ExportProgress, iter_file_sections, write_file_section, write_tree)
+from ignore_rules import IGNORE_FILES
+
+# 最後一次變更後等待的時間，以及一連串變更最多延後更新的時間
+DEBOUNCE_SECONDS = 0.15
+MAX_DEBOUNCE_SECONDS = 1.0
+# 輪詢模式下比對修改時間的間隔
+POLL_INTERVAL_SECONDS = 1.0
+# 主迴圈等待事件的間隔（同時決定停止與重新選取的反應時間）
+WAIT_SECONDS = 0.2
+
+# inotify 常數（見 <sys/inotify.h>）
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+WATCH_MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE
+              | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR)
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+class InotifyBackend:
+    """以 inotify 監看索引中的每個資料夾。wait() 回傳變更的相對路徑集合；佇列溢位時回傳 None"""
+    def __init__(self, root_path):
+        self.root_path = root_path
+        self.libc = ctypes.CDLL(ctypes.util.find_library("c") or None, use_errno=True)
+        self.fd = self.libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 失敗")
+        self.wds = {}
+        self.paths = {}
+
+    def watch_dirs(self, rel_paths):
+        """同步監看的資料夾：新增尚未監看的，移除已不存在的"""
+        rel_paths = set(rel_paths)
+        for rel_path in rel_paths - self.paths.keys():
+            path = os.path.join(self.root_path, *rel_path.split('/')) if rel_path else self.root_path
+            wd = self.libc.inotify_add_watch(self.fd, os.fsencode(path), WATCH_MASK)
+            if wd < 0:
+                code = ctypes.get_errno()
+                if code == errno.ENOSPC:
+                    raise OSError(code, "已達 inotify 監看數量上限（fs.inotify.max_user_watches）")
+                continue
+            self.wds[wd] = rel_path
+            self.paths[rel_path] = wd
+        for rel_path in self.paths.keys() - rel_paths:
+            self.libc.inotify_rm_watch(self.fd, self.paths.pop(rel_path))
+            # 之後會收到 IN_IGNORED，屆時再移除 wd 對應
+
+    def wait(self, timeout):
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return set()
+        changes = set()
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+                name = data[offset + _EVENT_HEADER.size:offset + _EVENT_HEADER.size + length].rstrip(b"\0")
+                offset += _EVENT_HEADER.size + length
+                if mask & IN_Q_OVERFLOW:
+                    return None
+                rel_dir = self.wds.get(wd)
+                if rel_dir is None:
+                    continue
+                if mask & IN_IGNORED:
+                    del self.wds[wd]
+                    if self.paths.get(rel_dir) == wd:
+                        del self.paths[rel_dir]
+                    continue
+                if name:
+                    name = os.fsdecode(name)
+                    changes.add(f"{rel_dir}/{name}" if rel_dir else name)
+                else:
+                    changes.add(rel_dir)
+        return changes
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingBackend:
+    """
+    定期比對索引中資料夾與檔案的修改時間與大小。
+    資料夾的修改時間在新增、刪除或重新命名項目時改變；檔案則比對索引記錄的大小與修改時間。
+    """
+    def __init__(self, root_path, index, interval=POLL_INTERVAL_SECONDS):
+        self.root_path = root_path
+        self.index = index
+        self.interval = interval
+        self.dir_mtimes = {}
+        self.next_poll = time.monotonic() + interval
+
+    def watch_dirs(self, rel_paths):
+        rel_paths = set(rel_paths)
+        for rel_path in list(self.dir_mtimes):
+            if rel_path not in rel_paths:
+                del self.dir_mtimes[rel_path]
+        for rel_path in rel_paths:
+            if rel_path not in self.dir_mtimes:
+                self.dir_mtimes[rel_path] = self._mtime(rel_path)
+
+    def _mtime(self, rel_path):
+        try:
+            return os.stat(self.index.abs_path(rel_path)).st_mtime_ns
+        except OSError:
+            return None
+
+    def wait(self, timeout):
+        delay = self.next_poll - time.monotonic()
+        if delay > timeout:
+            time.sleep(timeout)
+            return set()
+        if delay > 0:
+            time.sleep(delay)
+        self.next_poll = time.monotonic() + self.interval
+
+        changes = set()
+        for rel_path, mtime in list(self.dir_mtimes.items()):
+            if self._mtime(rel_path) != mtime:
+                changes.add(rel_path)
+            listing = self.index.dirs.get(rel_path)
+            if listing is None:
+                continue
+            prefix = rel_path + '/' if rel_path else ''
+            for entry in listing[1]:
+                file_rel = prefix + entry.name
+                try:
+                    st = os.stat(self.index.abs_path(file_rel))
+                except OSError:
+                    changes.add(file_rel)
+                    continue
+                if st.st_size != entry.size or st.st_mtime != entry.mtime:
+                    changes.add(file_rel)
+        return changes
+
+    def close(self):
+        pass
+
+
+def create_backend(root_path, index, force_polling=False):
+    """優先使用 inotify，無法使用時改為輪詢"""
+    if not force_polling and sys.platform.startswith("linux"):
+        try:
+            return InotifyBackend(root_path)
+        except (OSError, AttributeError):
+            pass
+    return PollingBackend(root_path, index)
+
+
+class ExportWatcher:
+    """
+    監看專案並持續更新匯出檔案。
+
+    select 為無參數函式，回傳目前要匯出的檔案完整路徑列表；每次更新時都會重新呼叫，
+    因此可以反映 GUI 中勾選狀態的變化（呼叫 refresh() 要求立即重新選取）。
+    on_update(changed_dirs) 在目錄結構改變時於監看執行緒中呼叫，changed_dirs 為
+    內容清單有改變的資料夾相對路徑集合，None 表示整個索引都已重建。
+    監看模式不使用 token 預算與區段快取：上一版輸出檔案本身就是快取。
+    """
+    def __init__(self, input_folder, output_file, index, select, include_tree=True, progress=None,
+                 max_file_bytes=None, read_workers=DEFAULT_READ_WORKERS, tree_max_depth=None,
+                 tree_max_entries=DEFAULT_TREE_MAX_ENTRIES, on_update=None, force_polling=False):
+        self.input_folder = input_folder
+        self.output_file = os.path.abspath(output_file)
+        self.index = index
+        self.select = select
+        self.include_tree = include_tree
+        self.progress = progress or ExportProgress()
+        self.max_file_bytes = max_file_bytes
+        self.read_workers = read_workers
+        self.tree_max_depth = tree_max_depth
+        self.tree_max_entries = tree_max_entries
+        self.on_update = on_update
+        self.force_polling = force_polling
+        self.stop_event = threading.Event()
+        self._refresh = threading.Event()
+
+        self.jobs = []
+        self.spans = {}
+        self.tree_span = None
+        self.output_stat = None
+
+        # 輸出檔案位於專案內時，忽略其本身與暫存檔的變更，不匯出它們，也不列在目錄結構中
+        self.temp_file = self.output_file + ".tmp"
+        self.own_paths = set()
+        for path in (self.output_file, self.temp_file):
+            rel_path = os.path.relpath(path, input_folder).replace('\\', '/')
+            if not rel_path.startswith('../'):
+                self.own_paths.add(rel_path)
+
+    def refresh(self):
+        """要求重新選取檔案並更新輸出（可從任何執行緒呼叫）"""
+        self._refresh.set()
+
+    def stop(self):
+        self.stop_event.set()
+
+    def run(self):
+        """在目前的執行緒中執行監看，直到 stop() 被呼叫"""
+        backend = create_backend(self.input_folder, self.index, self.force_polling)
+        try:
+            self._update(set(), rescan_all=False, force=True)
+            backend = self._sync_watches(backend)
+            mode = "inotify" if isinstance(backend, InotifyBackend) else "輪詢修改時間"
+            self.progress.log(f"👀 監看中（{mode}，{len(self.index.dirs):,} 個資料夾）\n", "info_header")
+
+            while not self.stop_event.is_set():
+                changes = backend.wait(WAIT_SECONDS)
+                refresh = self._refresh.is_set()
+                if changes is not None:
+                    changes = self._relevant(changes)
+                    if not changes and not refresh:
+                        continue
+
+                # 去抖動：持續收集直到安靜 DEBOUNCE_SECONDS，或已等待 MAX_DEBOUNCE_SECONDS
+                deadline = time.monotonic() + MAX_DEBOUNCE_SECONDS
+                while changes is not None and time.monotonic() < deadline:
+                    more = backend.wait(DEBOUNCE_SECONDS)
+                    if more is None:
+                        changes = None
+                    elif more:
+                        changes |= self._relevant(more)
+                    else:
+                        break
+
+                self._refresh.clear()
+                self._update(changes or set(), rescan_all=changes is None, force=refresh)
+                backend = self._sync_watches(backend)
+        finally:
+            backend.close()
+
+    def _sync_watches(self, backend):
+        """讓監看的資料夾與索引一致；超過 inotify 上限時改為輪詢，回傳使用中的 backend"""
+        try:
+            backend.watch_dirs(list(self.index.dirs))
+            return backend
+        except OSError as e:
+            if isinstance(backend, PollingBackend):
+                raise
+            self.progress.log(f"⚠️ {e}，改為輪詢修改時間\n", "error")
+            backend.close()
+            backend = PollingBackend(self.input_folder, self.index)
+            backend.watch_dirs(list(self.index.dirs))
+            return backend
+
+    def _relevant(self, changes):
+        """排除輸出檔案本身與隱藏項目（忽略檔除外）的變更"""
+        relevant = set()
+        for rel_path in changes:
+            if rel_path in self.own_paths:
+                continue
+            name = rel_path.rpartition('/')[2]
+            if name.startswith('.') and name not in IGNORE_FILES:
+                continue
+            relevant.add(rel_path)
+        return relevant
+
+    def _rescan(self, changes):
+        """
+        重新掃描有變動的資料夾，回傳內容清單（名稱）有改變的資料夾集合；
+        忽略檔改變時整個索引重建並回傳 None。
+        """
+        if any(rel_path.rpartition('/')[2] in IGNORE_FILES for rel_path in changes):
+            self.index.invalidate()
+            return None
+
+        index = self.index
+        to_scan = set()
+        for rel_path in changes:
+            if rel_path in index.dirs:
+                to_scan.add(rel_path)
+            parent = rel_path.rpartition('/')[0]
+            if parent in index.dirs:
+                to_scan.add(parent)
+
+        changed_dirs = set()
+        for rel_path in sorted(to_scan):
+            old = index.dirs.get(rel_path)
+            if not os.path.isdir(index.abs_path(rel_path)):
+                # 上層資料夾的名稱清單也會改變，由上層負責通知
+                index.invalidate(rel_path)
+                continue
+            dirs, files = index.scan_dir(rel_path)
+            if old is None or _names(old) != _names((dirs, files)):
+                changed_dirs.add(rel_path)
+                # 被刪除或改名的子資料夾不再需要保留掃描結果
+                remaining = {entry.name for entry in dirs}
+                prefix = rel_path + '/' if rel_path else ''
+                for entry in old[0] if old is not None else ():
+                    if entry.name not in remaining:
+                        index.invalidate(prefix + entry.name)
+        return changed_dirs
+
+    def _update(self, changes, rescan_all=False, force=False):
+        """套用變更並在需要時重寫輸出檔案"""
+        started = time.monotonic()
+        if rescan_all:
+            self.index.invalidate()
+            changed_dirs = None
+        else:
+            changed_dirs = self._rescan(changes)
+        tree_changed = changed_dirs is None or bool(changed_dirs)
+
+        jobs = [(file_path, os.path.relpath(file_path, self.input_folder).replace('\\', '/'))
+                for file_path in sorted(self.select())]
+        jobs = [job for job in jobs if job[1] not in self.own_paths]
+        if self.on_update is not None and tree_changed:
+            self.on_update(changed_dirs)
+
+        dirty = {rel_path for _, rel_path in jobs if rel_path in changes or rel_path not in self.spans}
+        if changed_dirs is None or not self._output_intact():
+            dirty = {rel_path for _, rel_path in jobs}
+            tree_changed = True
+        if not force and not dirty and not tree_changed and jobs == self.jobs:
+            return
+
+        self._write(jobs, dirty, tree_changed or self.tree_span is None)
+        self.jobs = jobs
+        elapsed = time.monotonic() - started
+        self.progress.log(f"🔄 已更新匯出檔案（重新轉換 {len(dirty):,} / {len(jobs):,} 個檔案，"
+                          f"{elapsed:.2f} 秒）: {self.output_file}\n", "success")
+
+    def _output_intact(self):
+        """上一版輸出檔案是否仍是本程式寫入的版本（位元組範圍才能沿用）"""
+        if self.output_stat is None:
+            return False
+        try:
+            st = os.stat(self.output_file)
+        except OSError:
+            return False
+        return (st.st_size, st.st_mtime_ns) == self.output_stat
+
+    def _write(self, jobs, dirty, tree_changed):
+        """寫入暫存檔後原子性地取代輸出檔案；未變更的區段從上一版複製"""
+        old = None
+        if self.output_stat is not None:
+            try:
+                old = open(self.output_file, 'rb')
+            except OSError:
+                dirty = {rel_path for _, rel_path in jobs}
+                tree_changed = True
+
+        spans = {}
+        output = ExportOutput(self.temp_file)
+        try:
+            outfile = output.outfile
+            if self.include_tree:
+                start = outfile.tell()
+                if tree_changed or old is None:
+                    write_tree(output, self.input_folder, self.index, self.tree_max_depth, self.tree_max_entries,
+                               self.own_paths)
+                else:
+                    _copy_range(old, outfile, *self.tree_span)
+                self.tree_span = (start, outfile.tell())
+
+            to_read = [job for job in jobs if job[1] in dirty]
+            # 剛被編輯的檔案可能在讀取期間再次被截短，不使用 mmap（見 exporter.MMAP_MIN_BYTES）
+            sizes = {file_path: self.index.file_size(rel_path) for file_path, rel_path in to_read}
+            sections = iter_file_sections(to_read, self.max_file_bytes, self.read_workers, use_mmap=False, sizes=sizes)
+            try:
+                for file_path, rel_path in jobs:
+                    start = outfile.tell()
+                    if rel_path not in dirty:
+                        _copy_range(old, outfile, *self.spans[rel_path])
+                    else:
+                        result = next(sections)[2]
+                        if isinstance(result, Exception):
+                            self.progress.log(f"❌ 讀取失敗: {file_path} - {result}\n", "error")
+                            continue
+                        if result is None:
+                            try:
+                                write_file_section(outfile, file_path, rel_path, self.max_file_bytes, use_mmap=False)
+                            except OSError as e:
+                                self.progress.log(f"❌ 讀取失敗: {file_path} - {e}\n", "error")
+                        else:
+                            outfile.write(result[0])
+                    spans[rel_path] = (start, outfile.tell())
+            finally:
+                sections.close()
+        finally:
+            output.close()
+            if old is not None:
+                old.close()
+
+        os.replace(self.temp_file, self.output_file)
+        st = os.stat(self.output_file)
+        self.output_stat = (st.st_size, st.st_mtime_ns)
+        self.spans = spans
+
+
+def _names(listing):
+    dirs, files = listing
+    return [entry.name for entry in dirs], [entry.name for entry in files]
+
+
+def _copy_range(infile, outfile, start, end):
+    """複製上一版輸出檔案中的一段位元組"""
+    infile.seek(start)
+    remaining = end - start
+    while remaining > 0:
+        chunk = infile.read(min(remaining, EXPORT_CHUNK_SIZE * 16))
+        if not chunk:
+            break
+        outfile.write(chunk)
+        remaining -= len(chunk)